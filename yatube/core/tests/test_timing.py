@@ -0,0 +1,91 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+User = get_user_model()
+
+
+@override_settings(SERVER_TIMING_HEADER=True)
+class ServerTimingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def metrics(self, response):
+        return {
+            match['name']: match
+            for match in re.finditer(
+                r'(?P<name>\w+);dur=(?P<dur>[\d.]+)(;desc="(?P<desc>[^"]*)")?',
+                response['Server-Timing'],
+            )
+        }
+
+    def test_header_reports_queries_templates_and_cache(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('posts:index'))
+        metrics = self.metrics(response)
+        self.assertEqual(set(metrics), {'db', 'tpl', 'cache', 'total'})
+        self.assertEqual(metrics['db']['desc'], '1 queries')
+        self.assertGreater(float(metrics['tpl']['dur']), 0)
+        self.assertGreaterEqual(
+            float(metrics['total']['dur']), float(metrics['tpl']['dur'])
+        )
+        self.assertRegex(
+            metrics['cache']['desc'], r'^\d+ hits, [1-9]\d* misses$'
+        )
+
+        response = self.client.get(reverse('posts:index'))
+        hits = int(self.metrics(response)['cache']['desc'].split()[0])
+        self.assertGreater(hits, 0)
+
+    @override_settings(SERVER_TIMING_LOG=True)
+    def test_request_is_logged(self):
+        with self.assertLogs('core.timing', 'INFO') as logs:
+            self.client.get(reverse('posts:index'))
+        self.assertRegex(
+            logs.output[0],
+            r'method=GET path=/ status=200 total_ms=[\d.]+ db_queries=1 ',
+        )
+
+    @override_settings(SERVER_TIMING_LOG=True)
+    def test_streamed_response_is_logged_after_body(self):
+        admin = User.objects.create_user(username='admin', is_staff=True)
+        self.client.force_login(admin)
+        with self.assertLogs('core.timing', 'INFO') as logs:
+            response = self.client.get(
+                reverse('posts:export', kwargs={'kind': 'posts'})
+            )
+            self.assertTrue(response.streaming)
+            self.assertIn('Server-Timing', response)
+            self.assertEqual(logs.output, [])
+            body = b''.join(response.streaming_content)
+        self.assertIn('Пост'.encode(), body)
+        queries = int(re.search(r'db_queries=(\d+)', logs.output[0])[1])
+        self.assertGreater(queries, 0)
+
+
+class ServerTimingDefaultsTest(TestCase):
+    """Без DEBUG заголовок видят только сотрудники, лог не пишется"""
+
+    def test_header_is_shown_to_staff_only(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+        admin = User.objects.create_user(username='admin', is_staff=True)
+        self.client.force_login(admin)
+        response = self.client.get(reverse('posts:index'))
+        self.assertIn('Server-Timing', response)
+
+    def test_request_is_not_logged(self):
+        with self.assertRaises(AssertionError):
+            with self.assertLogs('core.timing', 'INFO'):
+                self.client.get(reverse('posts:index'))
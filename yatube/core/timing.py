@@ -0,0 +1,238 @@
+"""Замер времени обработки запроса для заголовка Server-Timing и логов.
+
+Middleware заводит на запрос набор счётчиков в ContextVar и считает в
+них SQL-запросы через connection.execute_wrapper. Время рендеринга
+шаблонов и попадания в кеш приходят из тонких подклассов шаблонного
+бэкенда и кеша, подключённых в settings.py: без них соответствующие
+метрики просто остаются нулевыми. Во что обходится замер, показывает
+сценарий untimed команды benchmark_views.
+
+Заголовок раскрывает устройство сайта, поэтому по умолчанию он уходит
+только при DEBUG и сотрудникам; строка лога в логгер core.timing на
+уровне INFO пишется только при DEBUG. Оба поведения задают настройки
+SERVER_TIMING_HEADER и SERVER_TIMING_LOG: None — по DEBUG, True или
+False — всегда или никогда. Под тестами Django выключает DEBUG, так что
+там их включают явно.
+
+Тело потокового ответа (выгрузки, архивы) отдаётся уже после выхода из
+middleware. Заголовок уходит раньше тела и покрывает только время до
+начала отдачи, а запросы и время самой отдачи попадают в строку лога,
+которая для таких ответов пишется после последнего куска.
+"""
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import (
+    DjangoTemplates as BaseDjangoTemplates, Template, reraise
+)
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_timings', default=None)
+_MISSING = object()
+
+
+class Timings:
+    """Счётчики одного запроса; время в секундах."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_queries += 1
+            self.db_time += time.perf_counter() - started
+
+    def header(self, total):
+        return ', '.join((
+            f'db;dur={self.db_time * 1000:.1f};'
+            f'desc="{self.db_queries} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'cache;dur={self.cache_time * 1000:.1f};'
+            f'desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+            f'total;dur={total * 1000:.1f}',
+        ))
+
+    def fields(self, total):
+        return {
+            'total_ms': round(total * 1000, 1),
+            'db_queries': self.db_queries,
+            'db_ms': round(self.db_time * 1000, 1),
+            'template_ms': round(self.template_time * 1000, 1),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'cache_ms': round(self.cache_time * 1000, 1),
+        }
+
+
+def current():
+    """Счётчики текущего запроса или None вне запроса."""
+    return _current.get()
+
+
+def _enabled(name):
+    """Значение настройки SERVER_TIMING_*; None означает «по DEBUG»."""
+    value = getattr(settings, name, None)
+    return settings.DEBUG if value is None else value
+
+
+class ServerTimingMiddleware:
+    """Server-Timing и строка лога logfmt на каждый запрос.
+
+    Стоит первым в MIDDLEWARE, чтобы total покрывал и остальные
+    middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = Timings()
+        with measure(timings):
+            response = self.get_response(request)
+        if self.show_header(request):
+            response['Server-Timing'] = timings.header(
+                time.perf_counter() - timings.started
+            )
+        if not _enabled('SERVER_TIMING_LOG'):
+            return response
+        if response.streaming:
+            response.streaming_content = self.stream(
+                request, response, timings, response.streaming_content
+            )
+        else:
+            self.log(request, response, timings)
+        return response
+
+    def show_header(self, request):
+        if _enabled('SERVER_TIMING_HEADER'):
+            return True
+        # Сессию к этому моменту обычно уже прочитал шаблон или view.
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_staff
+
+    def stream(self, request, response, timings, content):
+        """Отдаёт тело ответа, считая каждый кусок, и пишет лог в конце."""
+        chunks = iter(content)
+        try:
+            while True:
+                # Счётчики ставятся на время одного куска: между кусками
+                # поток сервера может обслуживать другой код.
+                with measure(timings):
+                    chunk = next(chunks, _MISSING)
+                if chunk is _MISSING:
+                    return
+                yield chunk
+        finally:
+            self.log(request, response, timings)
+
+    def log(self, request, response, timings):
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        fields = timings.fields(time.perf_counter() - timings.started)
+        logger.info(
+            'method=%s path=%s status=%s %s',
+            request.method, request.path, response.status_code,
+            ' '.join(f'{name}={value}' for name, value in fields.items()),
+            extra={'timings': fields},
+        )
+
+
+@contextmanager
+def measure(timings):
+    """Считает в timings запросы к БД и всё, что читает current()."""
+    token = _current.set(timings)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timings))
+            yield
+    finally:
+        _current.reset(token)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        timings = current()
+        if timings is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.template_time += time.perf_counter() - started
+
+
+class DjangoTemplates(BaseDjangoTemplates):
+    """Шаблонный бэкенд Django, учитывающий время рендеринга.
+
+    Вложенные include и inclusion-теги рендерятся внутри шаблона
+    верхнего уровня, поэтому время не считается дважды.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(
+                self.engine.get_template(template_name), self
+            )
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class TimedCacheMixin:
+    """Подмешивается к бэкенду кеша и считает попадания и промахи.
+
+    Базовый get_many вызывает get для каждого ключа, поэтому внутри
+    get_many get не считается отдельно. Экземпляры кеша у каждого потока
+    свои, так что флага на экземпляре достаточно.
+    """
+    _in_get_many = False
+
+    def _record(self, started, hits, misses):
+        timings = current()
+        if timings is not None:
+            timings.cache_time += time.perf_counter() - started
+            timings.cache_hits += hits
+            timings.cache_misses += misses
+
+    def get(self, key, default=None, version=None):
+        if self._in_get_many:
+            return super().get(key, default, version)
+        started = time.perf_counter()
+        value = super().get(key, _MISSING, version)
+        hit = value is not _MISSING
+        self._record(started, int(hit), int(not hit))
+        return value if hit else default
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        started = time.perf_counter()
+        self._in_get_many = True
+        try:
+            found = super().get_many(keys, version)
+        finally:
+            self._in_get_many = False
+        self._record(started, len(found), len(keys) - len(found))
+        return found
+
+
+class TimedLocMemCache(TimedCacheMixin, LocMemCache):
+    pass
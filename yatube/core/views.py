@@ -1,4 +1,8 @@
+from django.conf import settings
 from django.shortcuts import render
+from django.views.static import serve
+
+from posts import storage
 
 
 def page_not_found(request, exception):
@@ -11,3 +15,15 @@ def csrf_failure(request, reason=''):
 
 def server_error(request):
     return render(request, 'core/500.html', status=500)
+
+
+def media(request, path):
+    """Раздача MEDIA_ROOT в режиме отладки.
+
+    Файлы, имя которых задано их содержимым, отдаются с Cache-Control:
+    immutable. В бою то же правило настраивается в веб-сервере.
+    """
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if storage.is_immutable(path):
+        response['Cache-Control'] = storage.IMMUTABLE_CACHE_CONTROL
+    return response
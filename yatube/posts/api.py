@@ -0,0 +1,132 @@
+"""JSON-версия лент только для чтения.
+
+Ленты те же, что и в HTML: те же наборы записей и курсорная пагинация.
+Валидаторы ответа (ETag и Last-Modified) считаются до сборки страницы
+через posts.conditional из версии ленты в кеше и даты самого свежего
+поста — это одно чтение кеша и один запрос по индексу. Если клиент
+прислал совпадающий If-None-Match, ответ 304 уходит без выборки
+страницы и сериализации.
+"""
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_safe
+
+from . import timelines, versions
+from .conditional import conditional
+from .models import Group, Post, User
+from .paginators import (
+    POSTS_PER_PAGE, CursorPaginator, MergedCursorPaginator
+)
+
+
+def _index(request):
+    return Post.objects.feed(), (versions.index(),)
+
+
+def _group(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return group.posts.feed(), (versions.group(group.pk),)
+
+
+def _profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return author.posts.feed(), (versions.profile(author.pk),)
+
+
+def _follow(request):
+    # Правка любого поста меняет версию главной, поэтому она покрывает
+    # и посты авторов из подписок.
+    return timelines.sources(request.user), (
+        versions.index(), versions.follows(request.user.pk)
+    )
+
+
+def _newest(sources):
+    """Дата самого свежего поста среди источников ленты."""
+    dates = [
+        queryset.order_by('-pub_date').values_list(
+            'pub_date', flat=True
+        ).first()
+        for queryset in sources
+    ]
+    return max(filter(None, dates), default=None)
+
+
+def _compute(resolve):
+    """Вычислитель валидаторов ленты для conditional().
+
+    Источник ленты запоминается в запросе, чтобы не строить его дважды.
+    """
+    def compute(request, **kwargs):
+        source, names = resolve(request, **kwargs)
+        request.feed_source = source
+        if isinstance(source, list):
+            return names, _newest(queryset for queryset, _, _ in source)
+        return names, _newest([source])
+    return compute
+
+
+def serialize(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+        'author': {
+            'username': post.author.username,
+            'full_name': post.author.get_full_name(),
+        },
+        'group': post.group and {
+            'slug': post.group.slug,
+            'title': post.group.title,
+        },
+        'image': post.image.url if post.image else None,
+        'image_color': post.image_color,
+    }
+
+
+def _link(request, cursor):
+    if cursor is None:
+        return None
+    return request.build_absolute_uri(
+        f'{request.path}?{urlencode({"cursor": cursor})}'
+    )
+
+
+def feed_view(resolve):
+    """JSON-представление ленты с условными GET по ETag и Last-Modified."""
+    @require_safe
+    @conditional(_compute(resolve))
+    def view(request, **kwargs):
+        source = request.feed_source
+        if isinstance(source, list):
+            paginator = MergedCursorPaginator(source, POSTS_PER_PAGE)
+        else:
+            paginator = CursorPaginator(source, POSTS_PER_PAGE)
+        page_obj = paginator.get_page(request.GET.get('cursor'))
+        return JsonResponse({
+            'results': [serialize(post) for post in page_obj],
+            'next': _link(request, paginator.next_cursor),
+            'previous': _link(request, paginator.previous_cursor),
+        }, json_dumps_params={'ensure_ascii': False})
+    return view
+
+
+def login_required_json(view):
+    """Анонимному клиенту — 401 в JSON, а не редирект на форму входа."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse(
+                {'detail': 'Требуется вход.'}, status=401
+            )
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+index = feed_view(_index)
+group_posts = feed_view(_group)
+profile = feed_view(_profile)
+follow_index = login_required_json(feed_view(_follow))
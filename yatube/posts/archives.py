@@ -0,0 +1,133 @@
+"""Архивы с данными пользователя, которые собираются в фоне.
+
+Пользователь заказывает архив, запрос лишь ставит его в очередь, а
+команда process_archives собирает zip: посты, комментарии и подписки в
+JSON плюс оригиналы картинок. Всё пишется в архив потоково, строка за
+строкой и кусок за куском, поэтому память не зависит от объёма данных.
+Архивы лежат вне MEDIA_ROOT и отдаются только владельцу.
+"""
+import io
+import logging
+import os
+import shutil
+import tempfile
+import zipfile
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import exports
+from .models import ExportArchive, Post
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+# Что попадает в архив: имя файла, выгрузка и фильтр по пользователю.
+SECTIONS = (
+    ('posts.json', 'posts', 'author'),
+    ('comments.json', 'comments', 'author'),
+    ('follows.json', 'follows', 'user'),
+)
+
+
+def root():
+    return settings.EXPORT_ARCHIVES_ROOT
+
+
+def request_archive(user):
+    """Ставит архив в очередь, если пользователь ещё не ждёт другой."""
+    with transaction.atomic():
+        archive = ExportArchive.objects.filter(
+            user=user,
+            status__in=(ExportArchive.PENDING, ExportArchive.BUILDING),
+        ).first()
+        if archive is None:
+            archive = ExportArchive.objects.create(user=user)
+    return archive
+
+
+def _write_json(archive_file, name, header, values):
+    with archive_file.open(name, 'w') as raw, \
+            io.TextIOWrapper(raw, encoding='utf-8') as text:
+        text.write('[')
+        for i, row in enumerate(exports.ndjson_lines(header, values)):
+            text.write(',\n' if i else '\n')
+            text.write(row.rstrip('\n'))
+        text.write('\n]\n')
+
+
+def _write_image(archive_file, storage, name):
+    info = zipfile.ZipInfo(f'images/{name}', timezone.now().timetuple()[:6])
+    info.compress_type = zipfile.ZIP_STORED
+    info.file_size = storage.size(name)
+    with storage.open(name) as source, archive_file.open(info, 'w') as target:
+        shutil.copyfileobj(source, target, CHUNK_SIZE)
+
+
+def build(archive):
+    """Собирает архив во временный файл и переносит его на место."""
+    username = archive.user.username
+    os.makedirs(root(), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=root(), prefix='.build-')
+    try:
+        with os.fdopen(fd, 'wb') as file, zipfile.ZipFile(
+            file, 'w', zipfile.ZIP_DEFLATED
+        ) as archive_file:
+            for name, kind, field in SECTIONS:
+                header, values = exports.rows(kind, **{field: username})
+                _write_json(archive_file, name, header, values)
+            storage = Post.image.field.storage
+            names = Post.objects.filter(author=archive.user).exclude(
+                image=''
+            ).values_list('image', flat=True).distinct().order_by('image')
+            for name in names.iterator():
+                if storage.exists(name):
+                    _write_image(archive_file, storage, name)
+        path = os.path.join(root(), f'{archive.user_id}-{archive.pk}.zip')
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    return path
+
+
+def remove(archive):
+    if archive.path and os.path.exists(archive.path):
+        os.unlink(archive.path)
+
+
+def _claim():
+    """Берёт из очереди старейший архив так, чтобы его не взял другой."""
+    for archive in ExportArchive.objects.filter(
+        status=ExportArchive.PENDING
+    ).order_by('pk')[:10]:
+        claimed = ExportArchive.objects.filter(
+            pk=archive.pk, status=ExportArchive.PENDING
+        ).update(status=ExportArchive.BUILDING)
+        if claimed:
+            return archive
+    return None
+
+
+def process():
+    """Собирает один архив из очереди, возвращает его или None."""
+    archive = _claim()
+    if archive is None:
+        return None
+    try:
+        archive.path = build(archive)
+    except Exception:
+        logger.exception('Не удалось собрать архив %s', archive.pk)
+        archive.status = ExportArchive.FAILED
+    else:
+        archive.status = ExportArchive.READY
+        archive.size = os.path.getsize(archive.path)
+        for old in ExportArchive.objects.filter(
+            user_id=archive.user_id, status=ExportArchive.READY
+        ).exclude(pk=archive.pk):
+            old.delete()
+    archive.finished = timezone.now()
+    archive.save()
+    return archive
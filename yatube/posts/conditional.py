@@ -0,0 +1,56 @@
+"""Условные GET для страниц и JSON-лент.
+
+Функция-вычислитель по аргументам представления одним запросом по
+индексу находит даты, от которых зависит страница (свежий пост, последний
+комментарий), и называет версии лент из posts.versions, покрывающие
+правки и удаления. Из них собираются ETag и Last-Modified; при
+совпадении с заголовками запроса ответ 304 уходит без рендеринга.
+"""
+import hashlib
+
+from django.views.decorators.http import condition
+
+from . import versions
+
+
+def validators(request, names, *parts):
+    """(ETag, Last-Modified) по версиям names и частям страницы parts.
+
+    В ETag входят пользователь и параметры запроса: страница зависит
+    от шапки и номера страницы. Даты среди parts учитываются
+    в Last-Modified.
+    """
+    stamps = versions.stamps(*names)
+    raw = ':'.join(map(str, (
+        versions.join(stamps), request.user.pk,
+        request.GET.urlencode(), *parts,
+    )))
+    dates = [part for part in parts if hasattr(part, 'isoformat')]
+    last_modified = max(dates + [versions.changed(stamps)])
+    return hashlib.md5(raw.encode()).hexdigest(), last_modified
+
+
+def _state(request, compute, kwargs):
+    if not hasattr(request, '_conditional'):
+        found = compute(request, **kwargs)
+        request._conditional = (
+            validators(request, *found) if found else (None, None)
+        )
+    return request._conditional
+
+
+def conditional(compute):
+    """Декоратор условного GET с валидаторами из compute.
+
+    compute(request, **kwargs) возвращает (names, *parts) для
+    validators() или None, если объекта нет, — тогда представление
+    выполняется как обычно и само отвечает 404.
+    """
+    return condition(
+        etag_func=lambda request, **kwargs: (
+            _state(request, compute, kwargs)[0]
+        ),
+        last_modified_func=lambda request, **kwargs: (
+            _state(request, compute, kwargs)[1]
+        ),
+    )
@@ -0,0 +1,85 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются атомарным UPDATE ... SET x = x ± 1 из сигналов
+создания и удаления Post, Comment и Follow, поэтому страницы читают
+готовые числа без COUNT(*). repair() пересчитывает всё пакетно; его же
+вызывает миграция, заполняющая счётчики для уже существующих данных.
+Уменьшение не опускает счётчик ниже нуля: поля неотрицательные.
+"""
+from itertools import islice
+
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Post, UserCounters
+
+
+def of(user):
+    """Счётчики пользователя; для пользователя без строки — нули."""
+    try:
+        return user.counters
+    except UserCounters.DoesNotExist:
+        return UserCounters(user=user)
+
+
+def _positive(queryset, field, delta):
+    """Уменьшение трогает только строки, где счётчик ещё больше нуля."""
+    if delta < 0:
+        return queryset.filter(**{f'{field}__gt': 0})
+    return queryset
+
+
+def bump_user(user_id, field, delta):
+    updated = _positive(
+        UserCounters.objects.filter(user_id=user_id), field, delta
+    ).update(**{field: F(field) + delta})
+    if not updated and delta > 0:
+        UserCounters.objects.get_or_create(user_id=user_id)
+        UserCounters.objects.filter(user_id=user_id).update(
+            **{field: F(field) + delta}
+        )
+
+
+def bump_post(post_id, delta):
+    _positive(
+        Post.objects.filter(pk=post_id), 'comments_count', delta
+    ).update(comments_count=F('comments_count') + delta)
+
+
+def _total(queryset, field):
+    """Подзапрос числа строк queryset для каждой строки внешнего запроса."""
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(field)
+        .annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def repair(batch_size=1000, apps=global_apps):
+    """Пересчитывает все счётчики пакетными UPDATE с подзапросами.
+
+    apps — реестр моделей; миграция передаёт исторический.
+    """
+    post_model = apps.get_model('posts', 'Post')
+    comment_model = apps.get_model('posts', 'Comment')
+    follow_model = apps.get_model('posts', 'Follow')
+    counters_model = apps.get_model('posts', 'UserCounters')
+    user_model = apps.get_model(settings.AUTH_USER_MODEL)
+    post_model.objects.update(
+        comments_count=_total(comment_model.objects, 'post')
+    )
+    missing = user_model.objects.filter(counters__isnull=True).values_list(
+        'pk', flat=True
+    ).iterator(chunk_size=batch_size)
+    while True:
+        batch = [counters_model(user_id=user_id)
+                 for user_id in islice(missing, batch_size)]
+        if not batch:
+            break
+        counters_model.objects.bulk_create(batch, ignore_conflicts=True)
+    counters_model.objects.update(
+        posts_count=_total(post_model.objects, 'author'),
+        followers_count=_total(follow_model.objects, 'author'),
+        following_count=_total(follow_model.objects, 'user'),
+    )
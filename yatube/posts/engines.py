@@ -0,0 +1,56 @@
+"""Движок sorl-thumbnail, который не декодирует JPEG целиком.
+
+Стандартный движок читает исходник в память и декодирует его в полном
+размере, даже если нужна миниатюра в десятки раз меньше. Этот движок
+открывает файл из хранилища без копии в память, просит декодер JPEG
+сразу уменьшить картинку в 2, 4 или 8 раз (draft) так, чтобы её хватило
+на миниатюру, а остаток уменьшения делает resize с reducing_gap.
+"""
+import math
+
+from PIL import Image
+from sorl.thumbnail.engines.pil_engine import Engine
+
+REDUCING_GAP = 2.0
+
+
+class DraftEngine(Engine):
+
+    def get_image(self, source):
+        file = source.storage.open(source.name)
+        image = Image.open(file)
+        image.source_file = file
+        return image
+
+    def cleanup(self, image):
+        source_file = getattr(image, 'source_file', None)
+        if source_file is not None:
+            source_file.close()
+
+    def create(self, image, geometry, options):
+        if image.format == 'JPEG' and not options.get('cropbox'):
+            self.draft(image, geometry, options)
+        return super().create(image, geometry, options)
+
+    def draft(self, image, geometry, options):
+        """Уменьшает JPEG при декодировании, но не меньше миниатюры.
+
+        Срабатывает только до первого декодирования: следующие варианты
+        из той же картинки строятся из уже уменьшенной, поэтому крупные
+        варианты надо строить первыми.
+        """
+        width, height = image.size
+        if options.get('orientation') and self.flip_dimensions(image):
+            geometry = geometry[::-1]
+        factor = self._calculate_scaling_factor(
+            width, height, geometry, options
+        )
+        if factor < 1:
+            image.draft(image.mode, (math.ceil(width * factor),
+                                     math.ceil(height * factor)))
+
+    def _scale(self, image, width, height):
+        return image.resize(
+            (width, height), resample=Image.ANTIALIAS,
+            reducing_gap=REDUCING_GAP,
+        )
@@ -1,5 +1,7 @@
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
 
+from . import uploads
 from .models import Post, Comment
 
 
@@ -16,6 +18,24 @@ class PostForm(ModelForm):
             'group': 'Группа, к которой будет относиться пост'
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.image_rejected = isinstance(
+            self.files.get('image'), uploads.RejectedUpload
+        )
+        if self.image_rejected:
+            # Заглушку не должен открывать ImageField.
+            self.files = self.files.copy()
+            del self.files['image']
+
+    def clean_image(self):
+        if self.image_rejected:
+            raise uploads.rejection_error()
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            image = uploads.sanitize(image)
+        return image
+
 
 class CommentForm(ModelForm):
     class Meta:
@@ -0,0 +1,116 @@
+"""Учёт ссылок постов на файлы картинок.
+
+Благодаря ContentAddressedStorage один файл может принадлежать
+нескольким постам, поэтому удаляется он только вместе с последним
+постом, который на него ссылается.
+"""
+import logging
+import posixpath
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from sorl import thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from . import thumbnails, versions
+from .models import Post, ThumbnailTask
+from .storage import is_immutable, is_sharded
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+def release(name):
+    """Удаляет файл и его миниатюры, если на него не ссылается ни один пост.
+
+    Файлы, загруженные до хранения по хешу, не трогаются, как и раньше.
+    Возвращает True, если файл удалён.
+    """
+    if not is_immutable(name) or Post.objects.filter(image=name).exists():
+        return False
+    ThumbnailTask.objects.filter(name=name).delete()
+    thumbnail.delete(ImageFile(name, Post.image.field.storage))
+    return True
+
+
+def _adopt(storage, directory, names):
+    """Копирует файлы на места по хешу, возвращает {старое: новое}."""
+    renames = {}
+    for name in sorted(names):
+        if is_sharded(name):
+            continue
+        try:
+            exists = storage.exists(name)
+        except SuspiciousFileOperation:
+            exists = False
+        if not exists:
+            logger.warning('Нет файла картинки %s', name)
+            continue
+        renames[name] = storage.adopt(name, directory)
+    return renames
+
+
+def move_to_shards(batch_size=BATCH_SIZE, progress=None):
+    """Переносит картинки постов в раскладку по хешу, возвращает их число.
+
+    Посты обходятся пачками по id. Для каждой пачки файлы сначала
+    копируются на новое место, затем ссылки в постах меняются одной
+    транзакцией. Старые файлы остаются на месте: их ещё могут запросить
+    страницы, отданные до переноса, и формы правки, открытые до него,
+    могут сохранить пост со старым именем. Удаляет их отдельный проход
+    delete_moved. Команду можно запускать на работающем сайте и
+    прерывать в любой момент.
+    """
+    storage = Post.image.field.storage
+    directory = Post.image.field.upload_to.rstrip('/')
+    last_id, moved = 0, 0
+    while True:
+        batch = list(
+            Post.objects.filter(pk__gt=last_id).exclude(image='')
+            .order_by('pk').values_list('pk', 'image')[:batch_size]
+        )
+        if not batch:
+            return moved
+        last_id = batch[-1][0]
+        renames = _adopt(storage, directory, {name for _, name in batch})
+        with transaction.atomic():
+            for old_name, new_name in renames.items():
+                Post.objects.filter(image=old_name).update(image=new_name)
+            versions.bump_posts(
+                Post.objects.filter(image__in=renames.values())
+            )
+        thumbnails.enqueue(*set(renames.values()))
+        moved += len(renames)
+        if progress:
+            progress(moved, last_id)
+
+
+def delete_moved():
+    """Удаляет старые файлы, уже скопированные на место по хешу.
+
+    Запускается отдельно и позже move_to_shards, когда открытые до
+    переноса страницы и формы уже не в ходу. Файл удаляется вместе с
+    миниатюрами, только если у него есть копия по хешу и ни один пост
+    не ссылается на него; ссылки проверяются прямо перед удалением.
+    Возвращает число удалённых файлов.
+    """
+    storage = Post.image.field.storage
+    directory = Post.image.field.upload_to.rstrip('/')
+    try:
+        names = storage.listdir(directory)[1]
+    except FileNotFoundError:
+        return 0
+    deleted = 0
+    for basename in sorted(names):
+        name = posixpath.join(directory, basename)
+        if basename.startswith('.') or not storage.adopted_name(
+            name, directory
+        ):
+            continue
+        if Post.objects.filter(image=name).exists():
+            logger.warning('На файл %s снова ссылается пост', name)
+            continue
+        thumbnail.delete(ImageFile(name, storage))
+        deleted += 1
+    return deleted
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts import placeholders
+
+
+class Command(BaseCommand):
+    help = 'Считает цвета-заглушки картинок постов, у которых их нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=placeholders.BATCH_SIZE,
+            help='Число постов, обрабатываемых за раз',
+        )
+
+    def handle(self, *args, **options):
+        total = placeholders.backfill(
+            options['batch_size'],
+            progress=lambda done: self.stdout.write(
+                f'Обработано постов: {done}'
+            ),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Цвета посчитаны, постов: {total}'
+        ))
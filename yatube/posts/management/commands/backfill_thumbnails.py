@@ -0,0 +1,120 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def _render(name):
+    try:
+        return thumbnails.render(name), None
+    except Exception as error:
+        return None, f'{name}: {error}'
+
+
+class Command(BaseCommand):
+    help = ('Строит миниатюры всех картинок постов в пуле процессов и '
+            'заносит их в хранилище ключей sorl-thumbnail. Готовые '
+            'миниатюры пропускаются, прогресс можно сохранять в файл и '
+            'продолжать с него.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Число процессов, по умолчанию по числу ядер',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Число постов, выбираемых из БД за раз',
+        )
+        parser.add_argument(
+            '--resume-from', type=int, default=0,
+            help='Начать с постов, id которых больше указанного',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл с id последнего обработанного поста для продолжения',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Не пропускать картинки, у которых миниатюры уже есть',
+        )
+
+    def handle(self, *args, **options):
+        last_id = max(options['resume_from'], self.read_checkpoint(options))
+        stats = {'done': 0, 'skipped': 0, 'failed': 0}
+        started = time.perf_counter()
+        if not connection.in_atomic_block:
+            # Дочерним процессам не нужны унаследованные соединения с БД.
+            connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=options['workers'],
+            mp_context=multiprocessing.get_context('fork'),
+        ) as pool:
+            # Пул с fork запускает все процессы при первой задаче: пустая
+            # задача делает это сейчас, пока первый запрос ниже не открыл
+            # соединение заново.
+            pool.submit(int).result()
+            while True:
+                chunk = list(
+                    Post.objects.filter(pk__gt=last_id).exclude(image='')
+                    .order_by('pk')
+                    .values_list('pk', 'image')[:options['chunk_size']]
+                )
+                if not chunk:
+                    break
+                names = sorted({name for _, name in chunk})
+                if not options['force']:
+                    todo = [name for name in names
+                            if not thumbnails.all_ready(name)]
+                    stats['skipped'] += len(names) - len(todo)
+                    names = todo
+                stored = []
+                for rendered, error in pool.map(
+                    _render, names,
+                    chunksize=max(1, len(names) // options['workers'] // 4),
+                ):
+                    if error:
+                        stats['failed'] += 1
+                        self.stderr.write(error)
+                    elif rendered is None:
+                        stats['skipped'] += 1
+                    else:
+                        thumbnails.store(rendered)
+                        stored.append(rendered[0])
+                        stats['done'] += 1
+                thumbnails.invalidate(stored)
+                last_id = chunk[-1][0]
+                self.write_checkpoint(options, last_id)
+                self.report(stats, started, last_id)
+        self.stdout.write(self.style.SUCCESS('Миниатюры построены'))
+        self.report(stats, started, last_id)
+
+    def read_checkpoint(self, options):
+        path = options['checkpoint']
+        if not path or not os.path.exists(path):
+            return 0
+        with open(path) as file:
+            return int(file.read().strip() or 0)
+
+    def write_checkpoint(self, options, last_id):
+        path = options['checkpoint']
+        if not path:
+            return
+        with open(f'{path}.tmp', 'w') as file:
+            file.write(str(last_id))
+        os.replace(f'{path}.tmp', path)
+
+    def report(self, stats, started, last_id):
+        elapsed = time.perf_counter() - started
+        rate = stats['done'] / elapsed if elapsed else 0
+        self.stdout.write(
+            f'id до {last_id}: построено {stats["done"]}, '
+            f'пропущено {stats["skipped"]}, ошибок {stats["failed"]}, '
+            f'{rate:.1f} картинок/с за {elapsed:.1f} с'
+        )
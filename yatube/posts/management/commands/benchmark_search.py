@@ -0,0 +1,104 @@
+import random
+import time
+from itertools import accumulate, islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from posts import search
+from posts.management.benchmarks import median, percentile, rolled_back
+from posts.models import Post
+from posts.paginators import POSTS_PER_PAGE
+
+User = get_user_model()
+
+VOCABULARY_SIZE = 20000
+WORDS_PER_POST = 30
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает поиск по индексу FTS5 с LIKE по таблице постов '
+            'на синтетических данных. Данные откатываются по завершении.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--queries', type=int, default=50)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        vocabulary = [f'слово{i}' for i in range(VOCABULARY_SIZE)]
+        weights = list(accumulate(
+            1 / (rank + 1) for rank in range(VOCABULARY_SIZE)
+        ))
+        with rolled_back():
+            author = User.objects.create(username=f'bench{time.time_ns()}')
+            started = time.perf_counter()
+            self.insert_posts(author, rng, vocabulary, weights, options)
+            self.stdout.write(
+                f'Вставлено {options["posts"]} постов за '
+                f'{time.perf_counter() - started:.1f} с'
+            )
+            started = time.perf_counter()
+            search.rebuild(options['batch_size'])
+            self.stdout.write(
+                f'Индекс построен за {time.perf_counter() - started:.1f} с'
+            )
+            terms = rng.sample(vocabulary[100:2000], options['queries'])
+            self.report('FTS5', [self.time_fts(term) for term in terms])
+            self.report('LIKE', [self.time_like(term) for term in terms])
+            self.check_counts(terms)
+
+    def insert_posts(self, author, rng, vocabulary, weights, options):
+        posts = (
+            Post(author=author, text=' '.join(
+                rng.choices(vocabulary, cum_weights=weights, k=WORDS_PER_POST)
+            ))
+            for _ in range(options['posts'])
+        )
+        while True:
+            batch = list(islice(posts, options['batch_size']))
+            if not batch:
+                return
+            Post.objects.bulk_create(batch)
+
+    def time_fts(self, term):
+        started = time.perf_counter()
+        rows = search.matching(term).order_by(*search.SEARCH_ORDERING)
+        list(rows[:POSTS_PER_PAGE])
+        return time.perf_counter() - started
+
+    def like(self, term):
+        """Посты со словом term целиком, как его находит FTS5.
+
+        Простой LIKE '%слово12%' нашёл бы и «слово120», поэтому слово
+        ищется между пробелами или на краю текста.
+        """
+        return Post.objects.feed().filter(
+            Q(text=term) | Q(text__startswith=f'{term} ')
+            | Q(text__endswith=f' {term}') | Q(text__contains=f' {term} ')
+        )
+
+    def time_like(self, term):
+        started = time.perf_counter()
+        list(self.like(term)[:POSTS_PER_PAGE])
+        return time.perf_counter() - started
+
+    def check_counts(self, terms):
+        """Оба способа должны находить одни и те же посты."""
+        for term in terms:
+            fts = search.matching(term).count()
+            like = self.like(term).count()
+            if fts != like:
+                self.stderr.write(
+                    f'{term}: FTS5 нашёл {fts} постов, LIKE — {like}'
+                )
+
+    def report(self, name, latencies):
+        latencies.sort()
+        self.stdout.write(
+            f'{name}: p50 {median(latencies) * 1000:.2f} мс, '
+            f'p99 {percentile(latencies, 0.99) * 1000:.2f} мс'
+        )
@@ -0,0 +1,132 @@
+import multiprocessing
+import os
+import resource
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+from PIL import Image
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.parsers import parse_geometry
+
+from posts import thumbnails
+from posts.management.benchmarks import median, percentile
+
+ENGINES = (
+    ('sorl', 'sorl.thumbnail.engines.pil_engine.Engine'),
+    ('draft', 'posts.engines.DraftEngine'),
+)
+
+
+def _status_kb(field):
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith(f'{field}:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _reset_peak_rss():
+    """Сбрасывает пиковый RSS процесса до текущего (Linux 4.0+)."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+    except OSError:
+        pass
+
+
+def _run(engine_path, location, names, geometry_string):
+    """Строит миниатюры в отдельном процессе, чтобы мерить его память."""
+    engine = import_string(engine_path)()
+    backend = thumbnails.QueuedThumbnailBackend()
+    storage = FileSystemStorage(location=location)
+    _reset_peak_rss()
+    baseline = _status_kb('VmRSS')
+    latencies = []
+    for name in names:
+        started = time.perf_counter()
+        source = ImageFile(name, storage)
+        image = engine.get_image(source)
+        try:
+            options = backend._full_options(source, thumbnails.FEED_OPTIONS)
+            options['image_info'] = engine.get_image_info(image)
+            geometry = parse_geometry(
+                geometry_string, engine.get_image_ratio(image, options)
+            )
+            thumbnail = engine.create(image, geometry, options)
+            engine._get_raw_data(
+                thumbnail, options['format'], options['quality'],
+                image_info=options['image_info'],
+            )
+        finally:
+            engine.cleanup(image)
+        latencies.append(time.perf_counter() - started)
+    return latencies, _status_kb('VmHWM') - baseline
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает стандартный движок sorl-thumbnail с DraftEngine '
+            'по времени и пиковой памяти на крупных фотографиях. Каждый '
+            'движок запускается в отдельном процессе.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source',
+            help='Каталог с JPEG; по умолчанию генерируются синтетические',
+        )
+        parser.add_argument('--images', type=int, default=20)
+        parser.add_argument('--size', default='6000x4000',
+                            help='Размер синтетических фотографий')
+        parser.add_argument('--geometry',
+                            default=thumbnails.FEED_THUMBNAIL[0])
+
+    def handle(self, *args, **options):
+        location = options['source'] or tempfile.mkdtemp()
+        try:
+            if not options['source']:
+                self.generate(location, options)
+            names = sorted(
+                name for name in os.listdir(location)
+                if name.lower().endswith(('.jpg', '.jpeg'))
+            )
+            self.stdout.write(f'Фотографий: {len(names)}')
+            results = {}
+            for label, engine_path in ENGINES:
+                with ProcessPoolExecutor(
+                    max_workers=1,
+                    mp_context=multiprocessing.get_context('fork'),
+                ) as pool:
+                    results[label] = pool.submit(
+                        _run, engine_path, location, names,
+                        options['geometry'],
+                    ).result()
+                self.report(label, *results[label])
+            base, fast = (median(sorted(results[label][0]))
+                          for label, _ in ENGINES)
+            self.stdout.write(f'Ускорение по медиане: {base / fast:.1f}x')
+        finally:
+            if not options['source']:
+                shutil.rmtree(location, ignore_errors=True)
+
+    def generate(self, location, options):
+        width, height = map(int, options['size'].split('x'))
+        for i in range(options['images']):
+            noise = Image.effect_noise((width, height), 40 + i)
+            gradient = Image.linear_gradient('L').resize((width, height))
+            image = Image.merge('RGB', (noise, gradient, noise.rotate(180)))
+            image.save(os.path.join(location, f'photo{i}.jpg'), quality=90)
+
+    def report(self, label, latencies, peak_kb):
+        latencies.sort()
+        self.stdout.write(
+            f'{label:>6}: p50 {median(latencies) * 1000:.1f} мс, '
+            f'p95 {percentile(latencies, 0.95) * 1000:.1f} мс, '
+            f'пик памяти +{peak_kb / 1024:.1f} МБ'
+        )
@@ -0,0 +1,138 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from posts import counters, timelines
+from posts.management.benchmarks import (
+    QueryCounter, median, percentile, rolled_back
+)
+from posts.models import Follow, Post, TimelineEntry
+from posts.paginators import MergedCursorPaginator, POSTS_PER_PAGE
+
+User = get_user_model()
+
+MODES = (
+    ('push', None),
+    ('pull', 0),
+    ('hybrid', 'threshold'),
+)
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает рассылку, сборку при чтении и гибридную ленту '
+            'подписок на синтетическом графе со степенным распределением '
+            'подписчиков. Все данные откатываются по завершении.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--follows-per-user', type=int, default=30)
+        parser.add_argument('--posts-per-author', type=int, default=20)
+        parser.add_argument('--new-posts', type=int, default=200)
+        parser.add_argument('--reads', type=int, default=200)
+        parser.add_argument('--skew', type=float, default=1.1,
+                            help='Показатель степени в законе Ципфа')
+        parser.add_argument('--threshold', type=int, default=200,
+                            help='Порог подписчиков для гибридного режима')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        with rolled_back():
+            self.build_graph(options)
+            for name, threshold in MODES:
+                if threshold == 'threshold':
+                    threshold = options['threshold']
+                with override_settings(TIMELINE_CELEBRITY_FOLLOWERS=threshold):
+                    self.report(name, self.run_mode(options))
+
+    def build_graph(self, options):
+        prefix = f'bench{time.monotonic_ns()}_'
+        User.objects.bulk_create(
+            User(username=f'{prefix}{i}') for i in range(options['users'])
+        )
+        self.user_ids = list(
+            User.objects.filter(username__startswith=prefix)
+            .order_by('id').values_list('id', flat=True)
+        )
+        weights = [1 / (rank + 1) ** options['skew']
+                   for rank in range(len(self.user_ids))]
+        follows = set()
+        for user_id in self.user_ids:
+            for author_id in self.rng.choices(
+                self.user_ids, weights, k=options['follows_per_user']
+            ):
+                if author_id != user_id:
+                    follows.add((user_id, author_id))
+        Follow.objects.bulk_create(
+            (Follow(user_id=user_id, author_id=author_id)
+             for user_id, author_id in follows)
+        )
+        Post.objects.bulk_create(
+            (Post(author_id=author_id, text='Синтетический пост')
+             for author_id in self.user_ids
+             for _ in range(options['posts_per_author']))
+        )
+        counters.repair()
+        self.author_weights = weights
+        top = self.user_ids[0]
+        self.stdout.write(
+            f'Граф: {len(self.user_ids)} пользователей, {len(follows)} '
+            f'подписок, подписчиков у самого популярного автора: '
+            f'{timelines.follower_counts(self.user_ids[:1]).get(top, 0)}'
+        )
+
+    def run_mode(self, options):
+        started = time.perf_counter()
+        timelines.rebuild()
+        rebuild_time = time.perf_counter() - started
+
+        authors = self.rng.choices(
+            self.user_ids, self.author_weights, k=options['new_posts']
+        )
+        entries_before = TimelineEntry.objects.count()
+        started = time.perf_counter()
+        for author_id in authors:
+            Post.objects.create(author_id=author_id, text='Новый пост')
+        write_time = time.perf_counter() - started
+        fan_out = TimelineEntry.objects.count() - entries_before
+
+        latencies, queries = [], []
+        for user_id in self.rng.sample(
+            self.user_ids, min(options['reads'], len(self.user_ids))
+        ):
+            user = User(id=user_id)
+            counter = QueryCounter()
+            started = time.perf_counter()
+            with connection.execute_wrapper(counter):
+                paginator = MergedCursorPaginator(
+                    timelines.sources(user), POSTS_PER_PAGE
+                )
+                list(paginator.get_page(None))
+            latencies.append(time.perf_counter() - started)
+            queries.append(counter.count)
+        latencies.sort()
+        return {
+            'rebuild_s': rebuild_time,
+            'rows': TimelineEntry.objects.count(),
+            'write_ms': write_time / len(authors) * 1000,
+            'fan_out': fan_out / len(authors),
+            'read_p50_ms': median(latencies) * 1000,
+            'read_p99_ms': percentile(latencies, 0.99) * 1000,
+            'read_queries': statistics.mean(queries),
+        }
+
+    def report(self, name, stats):
+        self.stdout.write(
+            f'{name:>6}: строк в лентах {stats["rows"]}, '
+            f'пересборка {stats["rebuild_s"]:.2f} с, '
+            f'запись {stats["write_ms"]:.2f} мс/пост '
+            f'(рассылка {stats["fan_out"]:.1f} строк), '
+            f'чтение p50 {stats["read_p50_ms"]:.2f} мс, '
+            f'p99 {stats["read_p99_ms"]:.2f} мс, '
+            f'{stats["read_queries"]:.1f} запросов'
+        )
@@ -0,0 +1,182 @@
+import gc
+import json
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from posts.management.benchmarks import (
+    QueryCounter, median, percentile, rolled_back
+)
+from posts.models import Group, Post, UserCounters
+
+User = get_user_model()
+
+# untimed — тёплый кеш без ServerTimingMiddleware: разница с warm и есть
+# цена замера.
+SCENARIOS = ('cold', 'warm', 'untimed')
+TIMING_MIDDLEWARE = 'core.timing.ServerTimingMiddleware'
+# Адрес не из INTERNAL_IPS, чтобы не включалась debug_toolbar.
+REMOTE_ADDR = '192.0.2.1'
+# Поля, по которым сравнивается с эталоном; запросы — без допуска.
+TIMINGS = ('p50_ms', 'p95_ms', 'p99_ms')
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержку, число запросов и размер ответа основных '
+            'страниц через тестовый клиент на текущей (например, '
+            'заполненной командой seed) базе, с холодным и тёплым кешем, '
+            'а также с тёплым кешем без ServerTimingMiddleware, чтобы '
+            'показать цену замера. Заголовок Server-Timing включается на '
+            'время замера, лог — как в настройках. Результат пишется в '
+            'JSON и сравнивается с эталоном. '
+            'Холодный сценарий очищает кеш, данные откатываются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100,
+                            help='Число замеров на страницу и сценарий')
+        parser.add_argument('--output', help='Куда записать результат')
+        parser.add_argument('--baseline', help='JSON прошлого запуска')
+        parser.add_argument('--threshold', type=float, default=0.1,
+                            help='Допустимый рост задержки, доля')
+
+    def handle(self, *args, **options):
+        targets = self.targets()
+        results = {}
+        hosts = [*settings.ALLOWED_HOSTS, 'testserver']
+        with rolled_back(), override_settings(
+            ALLOWED_HOSTS=hosts, SERVER_TIMING_HEADER=True
+        ):
+            for name, url, user in targets:
+                results[name] = {
+                    scenario: self.measure(
+                        url, user, scenario, options['requests']
+                    )
+                    for scenario in SCENARIOS
+                }
+                for scenario in SCENARIOS:
+                    self.report(name, scenario, results[name][scenario])
+                self.report_overhead(name, results[name])
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2, ensure_ascii=False)
+        if options['baseline']:
+            with open(options['baseline']) as file:
+                baseline = json.load(file)
+            regressions = compare(baseline, results, options['threshold'])
+            for line in regressions:
+                self.stderr.write(line)
+            if regressions:
+                raise CommandError(
+                    f'Регрессий относительно эталона: {len(regressions)}'
+                )
+            self.stdout.write(self.style.SUCCESS('Регрессий нет'))
+
+    def targets(self):
+        """Страницы для замера: самые нагруженные объекты базы."""
+        group = Group.objects.annotate(
+            size=Count('posts')
+        ).order_by('-size').first()
+        post = Post.objects.order_by('-comments_count').first()
+        author = UserCounters.objects.order_by('-posts_count').first()
+        reader = UserCounters.objects.order_by('-following_count').first()
+        if not (group and post and author and reader):
+            raise CommandError('База пуста: заполните её командой seed')
+        return [
+            ('index', reverse('posts:index'), None),
+            ('group_posts', reverse('posts:group_list', args=[group.slug]),
+             None),
+            ('profile', reverse('posts:profile', args=[author.user]), None),
+            ('post_detail', reverse('posts:post_detail', args=[post.pk]),
+             None),
+            ('follow_index', reverse('posts:follow_index'),
+             User.objects.get(pk=reader.user_id)),
+        ]
+
+    def measure(self, url, user, scenario, requests):
+        """Задержка, запросы и байты; холодный кеш чистится перед каждым."""
+        middleware = settings.MIDDLEWARE
+        if scenario == 'untimed':
+            middleware = [path for path in middleware
+                          if path != TIMING_MIDDLEWARE]
+        # Клиент собирает цепочку middleware при первом запросе.
+        with override_settings(MIDDLEWARE=middleware):
+            client = Client(REMOTE_ADDR=REMOTE_ADDR)
+            if user is not None:
+                client.force_login(user)
+            return self._measure(client, url, scenario, requests)
+
+    def _measure(self, client, url, scenario, requests):
+        if scenario != 'cold':
+            client.get(url)
+        latencies, queries, sizes = [], [], []
+        for _ in range(requests):
+            if scenario == 'cold':
+                cache.clear()
+            # Сборка мусора посреди замера даёт случайные выбросы в p99.
+            gc.collect()
+            counter = QueryCounter()
+            started = time.perf_counter()
+            with connection.execute_wrapper(counter):
+                response = client.get(url)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise CommandError(f'{url}: ответ {response.status_code}')
+            queries.append(counter.count)
+            sizes.append(len(response.content))
+        latencies.sort()
+        return {
+            'p50_ms': median(latencies) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'queries': statistics.median(queries),
+            'bytes': statistics.median(sizes),
+        }
+
+    def report(self, name, scenario, stats):
+        self.stdout.write(
+            f'{name:>12} {scenario:>4}: '
+            f'p50 {stats["p50_ms"]:.2f} мс, p95 {stats["p95_ms"]:.2f} мс, '
+            f'p99 {stats["p99_ms"]:.2f} мс, {stats["queries"]:.0f} запросов, '
+            f'{stats["bytes"]:.0f} байт'
+        )
+
+    def report_overhead(self, name, scenarios):
+        overhead = (scenarios['warm']['p50_ms']
+                    - scenarios['untimed']['p50_ms'])
+        self.stdout.write(f'{name:>12} цена Server-Timing: {overhead:+.2f} мс '
+                          f'к p50')
+
+
+def compare(baseline, results, threshold):
+    """Описания регрессий относительно эталона.
+
+    Регрессия — рост задержки больше чем на долю threshold или любой
+    рост числа запросов.
+    """
+    regressions = []
+    for name, scenarios in results.items():
+        for scenario, stats in scenarios.items():
+            base = baseline.get(name, {}).get(scenario)
+            if base is None:
+                continue
+            for field in TIMINGS:
+                if stats[field] > base[field] * (1 + threshold):
+                    regressions.append(
+                        f'{name} {scenario} {field}: {base[field]:.2f} → '
+                        f'{stats[field]:.2f}'
+                    )
+            if stats['queries'] > base['queries']:
+                regressions.append(
+                    f'{name} {scenario} queries: {base["queries"]} → '
+                    f'{stats["queries"]}'
+                )
+    return regressions
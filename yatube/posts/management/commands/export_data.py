@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import exports
+
+
+class Command(BaseCommand):
+    help = ('Потоково выгружает посты, комментарии или подписки в NDJSON '
+            'или CSV, не загружая их в память.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(exports.KINDS))
+        parser.add_argument('--format', choices=list(exports.FORMATS),
+                            default='ndjson')
+        parser.add_argument('--author', help='username автора')
+        parser.add_argument('--group', help='slug группы')
+        parser.add_argument('--user', help='username подписчика')
+        parser.add_argument('--since', help='Не раньше даты (ISO 8601)')
+        parser.add_argument('--until', help='Не позже даты (ISO 8601)')
+        parser.add_argument('--output', help='Файл; по умолчанию stdout')
+        parser.add_argument('--chunk-size', type=int,
+                            default=exports.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            header, values = exports.rows(
+                options['kind'],
+                author=options['author'],
+                group=options['group'],
+                since=options['since'],
+                until=options['until'],
+                user=options['user'],
+                chunk_size=options['chunk_size'],
+            )
+            lines = exports.lines(options['format'], header, values)
+        except exports.ExportError as error:
+            raise CommandError(error)
+        if options['output']:
+            with open(options['output'], 'w', newline='',
+                      encoding='utf-8') as file:
+                file.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import importer
+
+
+class Command(BaseCommand):
+    help = ('Импортирует посты из JSONL или CSV пачками. Счётчики, ленты, '
+            'поиск и миниатюры обновляются вместе с постами, а прерванный '
+            'импорт продолжается с места сбоя при повторном запуске.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с постами или - для stdin')
+        parser.add_argument(
+            '--format', choices=importer.FORMATS,
+            help='Формат; по умолчанию по расширению файла',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=importer.BATCH_SIZE,
+            help='Число строк в одной транзакции',
+        )
+        parser.add_argument(
+            '--images', help='Каталог, относительно которого ищутся картинки',
+        )
+        parser.add_argument(
+            '--create-authors', action='store_true',
+            help='Создавать незнакомых авторов без пароля',
+        )
+        parser.add_argument(
+            '--source',
+            help='Имя источника для продолжения; по умолчанию путь к файлу',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        format_ = options['format'] or os.path.splitext(path)[1].lstrip('.')
+        if format_ == 'json':
+            format_ = 'jsonl'
+        if format_ not in importer.FORMATS:
+            raise CommandError('Укажите --format: jsonl или csv')
+        source = options['source'] or (
+            'stdin' if path == '-' else os.path.abspath(path)
+        )
+        if path == '-':
+            self.run(sys.stdin, source, format_, options)
+        else:
+            with open(path, newline='', encoding='utf-8') as file:
+                self.run(file, source, format_, options)
+
+    def run(self, file, source, format_, options):
+        rows = importer.read_rows(file, format_)
+        done = importer.skip_done(source, rows)
+        if done:
+            self.stdout.write(f'Пропущено уже импортированных строк: {done}')
+        created, failed = 0, 0
+        started = time.perf_counter()
+        while True:
+            batch = list(islice(rows, options['batch_size']))
+            if not batch:
+                break
+            batch_created, errors = importer.import_batch(
+                source, batch, done,
+                images_dir=options['images'],
+                create_authors=options['create_authors'],
+            )
+            for number, error in errors:
+                self.stderr.write(f'Строка {number}: {error}')
+            done += len(batch)
+            created += batch_created
+            failed += len(errors)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'Строк {done}: создано {created}, ошибок {failed}, '
+                f'{created / elapsed:.0f} строк/с'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Импорт завершён: создано постов {created}, ошибок {failed}'
+        ))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import archives
+
+
+class Command(BaseCommand):
+    help = 'Собирает заказанные архивы с данными пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=5.0,
+            help='Пауза в секундах, когда очередь пуста',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Разобрать очередь и завершиться',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            archive = archives.process()
+            if archive is not None:
+                self.stdout.write(
+                    f'Архив {archive.pk} для {archive.user}: '
+                    f'{archive.get_status_display()}'
+                )
+            elif options['once']:
+                return
+            else:
+                time.sleep(options['interval'])
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Строит миниатюры картинок из очереди вне обработки запросов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=thumbnails.BATCH_SIZE,
+            help='Число картинок, забираемых из очереди за раз',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=2.0,
+            help='Пауза в секундах, когда очередь пуста',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Разобрать очередь и завершиться',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            done = thumbnails.process(options['batch_size'])
+            if done:
+                self.stdout.write(f'Обработано картинок: {done}')
+            elif options['once']:
+                return
+            else:
+                time.sleep(options['interval'])
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import timelines
+
+
+class Command(BaseCommand):
+    help = ('Раскладывает по лентам подписчиков посты авторов, переставших '
+            'быть «звёздами», вне обработки запросов')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=timelines.TASK_BATCH_SIZE,
+            help='Число авторов, забираемых из очереди за раз',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=2.0,
+            help='Пауза в секундах, когда очередь пуста',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Разобрать очередь и завершиться',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            done = timelines.process(options['batch_size'])
+            if done:
+                self.stdout.write(f'Обработано авторов: {done}')
+            elif options['once']:
+                return
+            else:
+                time.sleep(options['interval'])
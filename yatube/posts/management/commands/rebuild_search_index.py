@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает полнотекстовый индекс постов пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=search.BATCH_SIZE,
+            help='Число постов в одной пачке',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = search.rebuild(
+                options['batch_size'],
+                progress=lambda done: self.stdout.write(
+                    f'Проиндексировано постов: {done}'
+                ),
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс пересобран, постов: {total}'
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import timelines
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок с нуля'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=timelines.BATCH_SIZE,
+            help='Размер пачки при вставке записей',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = timelines.rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Ленты пересобраны, записей: {total}'
+        ))
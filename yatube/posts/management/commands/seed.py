@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import seeding
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, группами, '
+            'подписками, постами и комментариями для нагрузочных тестов. '
+            'Подписчики и активность распределены по закону Ципфа, '
+            'посты идут сериями.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=100)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--comments', type=int, default=300000)
+        parser.add_argument('--follows-per-user', type=int, default=30)
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней до сейчас раскидать посты')
+        parser.add_argument('--skew', type=float, default=1.1,
+                            help='Показатель степени в законе Ципфа')
+        parser.add_argument('--batch-size', type=int,
+                            default=seeding.BATCH_SIZE)
+        parser.add_argument('--skip-timelines', action='store_true',
+                            help='Не пересобирать ленты подписок')
+        parser.add_argument('--skip-search', action='store_true',
+                            help='Не пересобирать поисковый индекс')
+        parser.add_argument('--seed', type=int, default=None)
+
+    def handle(self, *args, **options):
+        if options['posts'] and not options['users']:
+            raise CommandError('Для постов нужны авторы: укажите --users')
+        self.started = time.perf_counter()
+        seeder = seeding.Seeder(
+            seed=options['seed'], skew=options['skew'],
+            days=options['days'], batch_size=options['batch_size'],
+            progress=self.report,
+        )
+        with seeding.bulk_speed():
+            seeder.users(options['users'])
+            seeder.groups(options['groups'])
+            seeder.follows(options['follows_per_user'])
+            seeder.posts(options['posts'], options['comments'])
+            seeder.finish(
+                rebuild_timelines=not options['skip_timelines'],
+                rebuild_search=not options['skip_search'],
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.perf_counter() - self.started:.1f} с'
+        ))
+
+    def report(self, kind, total):
+        self.stdout.write(
+            f'{kind}: {total} ({time.perf_counter() - self.started:.1f} с)'
+        )
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from posts import images
+
+
+class Command(BaseCommand):
+    help = ('Переносит картинки постов в каталоги по префиксам хеша '
+            'содержимого и обновляет ссылки в постах. Безопасна на '
+            'работающем сайте и может быть прервана и запущена снова. '
+            'Старые файлы остаются, их удаляет запуск с --delete-old.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=images.BATCH_SIZE,
+            help='Число постов в одной транзакции',
+        )
+        parser.add_argument(
+            '--delete-old', action='store_true',
+            help=('Не переносить, а удалить со старых мест файлы, уже '
+                  'перенесённые и не нужные ни одному посту. Запускать '
+                  'позже переноса'),
+        )
+
+    def handle(self, *args, **options):
+        if options['delete_old']:
+            deleted = images.delete_moved()
+            self.stdout.write(self.style.SUCCESS(
+                f'Удалено старых файлов: {deleted}'
+            ))
+            return
+        moved = images.move_to_shards(
+            options['batch_size'],
+            progress=lambda done, last_id: self.stdout.write(
+                f'Перенесено файлов: {done}, посты до id {last_id}'
+            ),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Картинки разложены по каталогам, перенесено: {moved}'
+        ))
@@ -0,0 +1,33 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0017_importcheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportArchive',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('building', 'Собирается'), ('ready', 'Готов'), ('failed', 'Ошибка')], db_index=True, default='pending', max_length=10, verbose_name='Состояние')),
+                ('path', models.CharField(blank=True, max_length=255, verbose_name='Файл')),
+                ('size', models.BigIntegerField(blank=True, null=True, verbose_name='Размер')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Заказан')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='Собран')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='export_archives', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Архив данных',
+                'verbose_name_plural': 'Архивы данных',
+                'ordering': ['-created'],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.db import migrations
+
+from posts import counters
+
+
+def fill_counters(apps, schema_editor):
+    # Без этого у постов и авторов, появившихся до 0012, счётчики нулевые,
+    # и первое же удаление упирается в CHECK неотрицательного поля.
+    counters.repair(apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0020_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
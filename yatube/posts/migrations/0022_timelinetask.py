@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0021_backfill_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineTask',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Поставлена в очередь')),
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_task', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+            ],
+            options={
+                'verbose_name': 'Задача на рассылку ленты',
+                'verbose_name_plural': 'Очередь рассылки лент',
+            },
+        ),
+    ]
@@ -1,7 +1,10 @@
 from django.db import models
+from django.db.models import Lookup
 from django.db.models.constraints import UniqueConstraint
 from django.contrib.auth import get_user_model
 
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
@@ -21,6 +24,12 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        """Посты вместе с автором и группой одним запросом."""
+        return self.select_related('author', 'group')
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст',
@@ -47,11 +56,32 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
-        blank=True
+        storage=ContentAddressedStorage(),
+        blank=True,
+        db_index=True,
+    )
+    image_color = models.CharField(
+        'Цвет-заглушка картинки', max_length=7, blank=True, editable=False
     )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев', default=0, editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx'),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
@@ -59,6 +89,12 @@ class Post(models.Model):
         return self.text[:15]
 
 
+class CommentQuerySet(models.QuerySet):
+    def with_authors(self):
+        """Комментарии вместе с авторами одним запросом."""
+        return self.select_related('author')
+
+
 class Comment(models.Model):
     post = models.ForeignKey(
         Post,
@@ -79,9 +115,16 @@ class Comment(models.Model):
         auto_now_add=True, verbose_name='Дата публикации'
     )
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Комментарии'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx'),
+        ]
 
 
 class Follow(models.Model):
@@ -108,5 +151,174 @@ class Follow(models.Model):
                 name='check_following'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx'),
+        ]
         verbose_name = 'Подписки'
         verbose_name_plural = 'Подписки'
+
+
+class TimelineEntry(models.Model):
+    """Пост в материализованной ленте подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        ordering = ['-pub_date', '-post_id']
+        constraints = [
+            UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx'),
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Ленты подписок'
+
+
+class UserCounters(models.Model):
+    """Счётчики пользователя, обновляемые сигналами, см. posts.counters."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков', default=0
+    )
+    following_count = models.PositiveIntegerField('Число подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+
+class Match(Lookup):
+    """Полнотекстовый поиск SQLite FTS5: column MATCH query."""
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+class SearchTextField(models.TextField):
+    pass
+
+
+SearchTextField.register_lookup(Match)
+
+
+class PostSearchIndex(models.Model):
+    """Строка виртуальной таблицы FTS5 с текстом поста, см. posts.search."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        related_name='search_index',
+    )
+    text = SearchTextField()
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'posts_post_fts'
+
+
+class ThumbnailTask(models.Model):
+    """Картинка, ожидающая миниатюр, см. posts.thumbnails."""
+    name = models.CharField('Путь к картинке', max_length=255, unique=True)
+    created = models.DateTimeField('Поставлена в очередь', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Задача на миниатюры'
+        verbose_name_plural = 'Очередь миниатюр'
+
+
+class TimelineTask(models.Model):
+    """Автор, переставший быть «звездой»: его посты ждут рассылки по лентам.
+
+    См. posts.timelines.
+    """
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline_task',
+        verbose_name='Автор',
+    )
+    created = models.DateTimeField('Поставлена в очередь', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Задача на рассылку ленты'
+        verbose_name_plural = 'Очередь рассылки лент'
+
+
+class ImportCheckpoint(models.Model):
+    """Сколько строк источника уже импортировано, см. posts.importer."""
+    source = models.CharField('Источник', max_length=255, unique=True)
+    rows = models.PositiveIntegerField('Обработано строк', default=0)
+    updated = models.DateTimeField('Обновлено', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Прогресс импорта'
+        verbose_name_plural = 'Прогресс импорта'
+
+
+class ExportArchive(models.Model):
+    """Архив с данными пользователя, см. posts.archives."""
+    PENDING = 'pending'
+    BUILDING = 'building'
+    READY = 'ready'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (BUILDING, 'Собирается'),
+        (READY, 'Готов'),
+        (FAILED, 'Ошибка'),
+    )
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='export_archives',
+        verbose_name='Пользователь',
+    )
+    status = models.CharField(
+        'Состояние', max_length=10, choices=STATUSES, default=PENDING,
+        db_index=True,
+    )
+    path = models.CharField('Файл', max_length=255, blank=True)
+    size = models.BigIntegerField('Размер', null=True, blank=True)
+    created = models.DateTimeField('Заказан', auto_now_add=True)
+    finished = models.DateTimeField('Собран', null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['user', '-created'],
+                name='archive_user_created_idx'),
+        ]
+        verbose_name = 'Архив данных'
+        verbose_name_plural = 'Архивы данных'
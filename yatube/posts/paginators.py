@@ -0,0 +1,213 @@
+import base64
+import binascii
+import heapq
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+
+POSTS_PER_PAGE = 10
+FEED_ORDERING = ('-pub_date', '-id')
+COMMENTS_PER_PAGE = 50
+COMMENT_ORDERING = ('created', 'id')
+
+
+def encode_cursor(values):
+    raw = json.dumps(
+        [value.isoformat() if hasattr(value, 'isoformat') else value
+         for value in values],
+        separators=(',', ':'),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Значения ключа из токена или None, если токен испорчен."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, TypeError):
+        return None
+    if not isinstance(values, list):
+        return None
+    return values
+
+
+def _seek(ordering, values, backwards):
+    """Условие «строго после ключа» в порядке обхода.
+
+    Условие в форме ИЛИ SQLite не превращает в диапазон индекса и
+    проходит индекс с начала, поэтому к нему добавлена избыточная
+    граница по первому полю: pub_date <= v0 AND (pub_date < v0 OR ...).
+    """
+    condition = Q()
+    for i in reversed(range(len(ordering))):
+        field = ordering[i].lstrip('-')
+        descending = ordering[i].startswith('-') != backwards
+        lookup = 'lt' if descending else 'gt'
+        step = Q(**{f'{field}__{lookup}': values[i]})
+        if i < len(ordering) - 1:
+            step |= Q(**{field: values[i]}) & condition
+        condition = step
+    if len(ordering) > 1:
+        condition = Q(**{f'{field}__{lookup}e': values[0]}) & condition
+    return condition
+
+
+def seek(queryset, ordering, values, backwards=False):
+    """Набор записей после ключа values в порядке обхода."""
+    if values:
+        queryset = queryset.filter(_seek(ordering, values, backwards))
+    if backwards:
+        ordering = [field[1:] if field.startswith('-') else f'-{field}'
+                    for field in ordering]
+    return queryset.order_by(*ordering)
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация по упорядоченному набору полей.
+
+    Страница выбирается условием на ключ последней показанной записи,
+    поэтому нет ни COUNT(*), ни OFFSET, и глубокие страницы отдаются
+    так же быстро, как первая. Номера страниц относительные: текущая
+    страница всегда первая или вторая, а num_pages лишь сообщает,
+    есть ли следующая.
+    """
+    cursor_mode = True
+
+    def __init__(self, object_list, per_page, ordering=FEED_ORDERING):
+        super().__init__(object_list, per_page)
+        self.ordering = ordering
+        self.next_cursor = None
+        self.previous_cursor = None
+        self.page_objects = []
+        self._number = 1
+        self._has_next = False
+
+    @property
+    def count(self):
+        return len(self.page_objects)
+
+    @property
+    def num_pages(self):
+        return self._number + int(self._has_next)
+
+    def _key(self, obj):
+        return [getattr(obj, field.lstrip('-')) for field in self.ordering]
+
+    def _fields(self):
+        opts = self.object_list.model._meta
+        return [opts.get_field(name.lstrip('-')) for name in self.ordering]
+
+    def _clean(self, values):
+        """Значения ключа, приведённые к типам полей, или None.
+
+        Токен приходит от клиента, поэтому подделанные значения
+        отбрасываются здесь, а не падают в запросе.
+        """
+        fields = self._fields()
+        if len(values) != len(fields):
+            return None
+        try:
+            values = [
+                field.to_python(value) for field, value in zip(fields, values)
+            ]
+        except (ValidationError, ValueError, TypeError):
+            return None
+        return None if None in values else values
+
+    def _fetch(self, values, backwards, limit):
+        return list(
+            seek(self.object_list, self.ordering, values, backwards)[:limit]
+        )
+
+    def get_page(self, cursor):
+        """Страница после ключа из токена; битый токен — первая страница."""
+        values = decode_cursor(cursor) if cursor else None
+        backwards = bool(values) and values[0] == 'prev'
+        if backwards:
+            values = values[1:]
+        if values is not None:
+            values = self._clean(values)
+            backwards = backwards and values is not None
+        rows = self._fetch(values, backwards, self.per_page + 1)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            has_previous, self._has_next = has_more, True
+        else:
+            has_previous, self._has_next = values is not None, has_more
+        self._number = 2 if has_previous else 1
+        self.page_objects = rows
+        if rows and self._has_next:
+            self.next_cursor = encode_cursor(self._key(rows[-1]))
+        if rows and has_previous:
+            self.previous_cursor = encode_cursor(
+                ['prev'] + self._key(rows[0])
+            )
+        return Page(rows, self._number, self)
+
+    def page(self, number):
+        return self.get_page(number)
+
+
+class MergedCursorPaginator(CursorPaginator):
+    """Keyset-пагинация по слиянию нескольких упорядоченных источников.
+
+    Источник — тройка (queryset, ordering, convert): из каждого берётся
+    не больше страницы записей после курсора, convert приводит запись
+    к общему виду, а heapq.merge сливает потоки по общему ключу.
+    Все поля общего ключа должны сортироваться в одну сторону.
+    """
+
+    def __init__(self, sources, per_page, ordering=FEED_ORDERING):
+        super().__init__(None, per_page, ordering)
+        self.sources = sources
+
+    def _fields(self):
+        queryset, ordering, _ = self.sources[0]
+        opts = queryset.model._meta
+        return [opts.get_field(name.lstrip('-')) for name in ordering]
+
+    def _fetch(self, values, backwards, limit):
+        streams = [
+            map(convert or (lambda row: row),
+                seek(queryset, ordering, values, backwards)[:limit])
+            for queryset, ordering, convert in self.sources
+        ]
+        descending = self.ordering[0].startswith('-') != backwards
+        rows, last = [], None
+        merged = heapq.merge(*streams, key=self._key, reverse=descending)
+        for row in merged:
+            if row.pk == last:
+                continue
+            last = row.pk
+            rows.append(row)
+            if len(rows) == limit:
+                break
+        return rows
+
+
+def page_mode(request):
+    """Нужна ли обычная нумерованная пагинация вместо курсора."""
+    return ('page' in request.GET
+            or settings.POSTS_PAGINATION == 'page')
+
+
+def paginate(request, object_list, per_page=POSTS_PER_PAGE,
+             ordering=FEED_ORDERING):
+    """Страница ленты: курсор по умолчанию, ?page=N для малых таблиц."""
+    if page_mode(request):
+        paginator = Paginator(object_list, per_page)
+        return paginator.get_page(request.GET.get('page'))
+    paginator = CursorPaginator(object_list, per_page, ordering)
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+def paginate_merged(request, sources, per_page=POSTS_PER_PAGE):
+    """Курсорная страница слияния источников, см. MergedCursorPaginator."""
+    paginator = MergedCursorPaginator(sources, per_page)
+    return paginator.get_page(request.GET.get('cursor'))
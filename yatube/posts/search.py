@@ -0,0 +1,79 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+Текст постов дублируется в виртуальную таблицу posts_post_fts, которую
+создаёт миграция. Сигналы обновляют её при сохранении и удалении поста,
+а rebuild() пересобирает её пачками после массовых изменений в обход
+сигналов (bulk_create, update).
+"""
+from django.db import connection
+
+from .models import Post, PostSearchIndex
+
+TABLE = PostSearchIndex._meta.db_table
+BATCH_SIZE = 5000
+SEARCH_ORDERING = ('rank', 'post_id')
+
+
+def to_match(query):
+    """Запрос пользователя как FTS5-выражение: все слова, каждое фразой."""
+    words = query.split()
+    return ' '.join('"{}"'.format(word.replace('"', '""')) for word in words)
+
+
+def index_post(post):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post.pk])
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text) VALUES (%s, %s)',
+            [post.pk, post.text],
+        )
+
+
+def index_posts(posts):
+    """Добавляет в индекс новые посты одним запросом."""
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, text) VALUES (%s, %s)',
+            [(post.pk, post.text) for post in posts],
+        )
+
+
+def unindex_post(post_id):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post_id])
+
+
+def rebuild(batch_size=BATCH_SIZE, progress=None):
+    """Пересобирает индекс пачками по возрастанию id, возвращает их число."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+    last_id, total = 0, 0
+    while True:
+        batch = list(
+            Post.objects.filter(pk__gt=last_id).order_by('pk')
+            .values_list('pk', 'text')[:batch_size]
+        )
+        if not batch:
+            return total
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {TABLE} (rowid, text) VALUES (%s, %s)', batch
+            )
+        last_id = batch[-1][0]
+        total += len(batch)
+        if progress:
+            progress(total)
+
+
+def matching(query):
+    """Строки индекса, подходящие под запрос, с постами и рангом bm25."""
+    return PostSearchIndex.objects.filter(
+        text__match=to_match(query)
+    ).select_related('post__author', 'post__group')
+
+
+def post_ids(query):
+    """Подзапрос id постов, подходящих под запрос, для фильтра pk__in."""
+    return PostSearchIndex.objects.filter(
+        text__match=to_match(query)
+    ).values('post_id')
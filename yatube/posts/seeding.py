@@ -0,0 +1,267 @@
+"""Синтетические данные для нагрузочного тестирования.
+
+Распределения близки к настоящим: число подписчиков и активность
+авторов подчиняются закону Ципфа, а посты идут сериями — автор пишет
+несколько постов подряд с короткими паузами, потом надолго замолкает.
+Комментарии тоже достаются в основном немногим постам.
+
+Пользователи и группы создаются через bulk_create. Подписки, посты и
+комментарии — это миллионы строк, и для них bulk_create тратит почти всё
+время на сборку SQL по полям модели (а на SQLite ещё и режет вставку
+на пачки по 999 параметров), поэтому они пишутся через executemany с
+заранее известными id. Сигналы при этом не срабатывают, так что
+счётчики, ленты и поисковый индекс пересобираются в конце целиком.
+"""
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import counters, search, timelines, versions
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 10000
+VOCABULARY_SIZE = 5000
+# Тексты — случайные отрезки одной длинной последовательности слов:
+# так они различаются, а слова не приходится выбирать для каждой строки.
+CORPUS_WORDS = 1000000
+# Доля постов, которые продолжают серию того же автора, и средняя
+# пауза внутри серии в долях средней паузы между постами.
+BURST_PROBABILITY = 0.8
+BURST_GAP = 0.05
+COMMENT_DELAY = 3600
+EPOCH = datetime(1970, 1, 1)
+# executemany обходит default модели, поэтому перечислены все поля.
+POST_FIELDS = (
+    'id', 'author', 'group', 'text', 'pub_date', 'image', 'image_color',
+    'comments_count',
+)
+COMMENT_FIELDS = ('id', 'post', 'author', 'text', 'created')
+# На время генерации SQLite не ждёт записи на диск: базу для
+# бенчмарков при сбое проще сгенерировать заново.
+SQLITE_PRAGMAS = {
+    'synchronous': 'OFF',
+    'journal_mode': 'MEMORY',
+    'temp_store': 'MEMORY',
+    'cache_size': '-262144',
+}
+
+
+@contextmanager
+def bulk_speed():
+    """Быстрые настройки SQLite на время генерации.
+
+    Внутри транзакции SQLite не меняет их, тогда блок выполняется как есть.
+    """
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        yield
+        return
+    with connection.cursor() as cursor:
+        previous = {}
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name}')
+            previous[name] = cursor.fetchone()[0]
+            cursor.execute(f'PRAGMA {name} = {value}')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            for name, value in previous.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def zipf(count, skew):
+    """Накопленные веса закона Ципфа для rng.choices(cum_weights=...)."""
+    return list(accumulate(1 / (rank + 1) ** skew for rank in range(count)))
+
+
+def insert_rows(model, fields, rows):
+    """INSERT готовых значений полей fields одним executemany."""
+    opts = model._meta
+    columns = ', '.join(
+        connection.ops.quote_name(opts.get_field(name).column)
+        for name in fields
+    )
+    placeholders = ', '.join(['%s'] * len(fields))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {connection.ops.quote_name(opts.db_table)} '
+            f'({columns}) VALUES ({placeholders})',
+            rows,
+        )
+
+
+class Seeder:
+    """Генератор данных; id созданных пользователей и групп в памяти."""
+
+    def __init__(self, seed=None, skew=1.1, days=365,
+                 batch_size=BATCH_SIZE, progress=None):
+        self.rng = random.Random(seed)
+        self.skew = skew
+        self.end = timezone.now().timestamp()
+        self.start = self.end - timedelta(days=days).total_seconds()
+        self.batch_size = batch_size
+        self.progress = progress or (lambda kind, total: None)
+        self.prefix = f'seed{time.time_ns()}_'
+        vocabulary = [f'слово{i}' for i in range(VOCABULARY_SIZE)]
+        self.corpus = self.rng.choices(
+            vocabulary, cum_weights=zipf(VOCABULARY_SIZE, 1.0),
+            k=CORPUS_WORDS,
+        )
+        self.user_ids, self.group_ids = [], []
+
+    def _last_id(self, model):
+        return model.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+
+    def _new_ids(self, model, last_id):
+        return list(
+            model.objects.filter(pk__gt=last_id).order_by('pk')
+            .values_list('pk', flat=True)
+        )
+
+    def _date(self, timestamp):
+        # Соединения Django работают в UTC, так что наивное время в UTC
+        # подходит без пересчёта часовых поясов на каждой строке.
+        return connection.ops.adapt_datetimefield_value(
+            EPOCH + timedelta(seconds=timestamp)
+        )
+
+    def _text(self):
+        length = int(self.rng.lognormvariate(3, 0.7)) + 1
+        offset = self.rng.randrange(len(self.corpus) - length)
+        return ' '.join(self.corpus[offset:offset + length])
+
+    def _popular(self, k):
+        return self.rng.choices(
+            self.user_ids, cum_weights=self.user_weights, k=k
+        )
+
+    def users(self, count):
+        last_id = self._last_id(User)
+        password = make_password(None)
+        joined = datetime.fromtimestamp(self.start, dt_timezone.utc)
+        for first in range(0, count, self.batch_size):
+            User.objects.bulk_create(
+                User(username=f'{self.prefix}{i}', password=password,
+                     date_joined=joined)
+                for i in range(first, min(first + self.batch_size, count))
+            )
+            self.progress('users', min(first + self.batch_size, count))
+        # Популярность не должна совпадать с порядком создания.
+        self.user_ids = self._new_ids(User, last_id)
+        self.rng.shuffle(self.user_ids)
+        self.user_weights = zipf(len(self.user_ids), self.skew)
+
+    def groups(self, count):
+        last_id = self._last_id(Group)
+        Group.objects.bulk_create(
+            Group(title=f'Группа {i}', slug=f'{self.prefix}{i}',
+                  description='Сгенерированная группа')
+            for i in range(count)
+        )
+        self.group_ids = self._new_ids(Group, last_id)
+        self.group_weights = zipf(len(self.group_ids), self.skew)
+        self.progress('groups', len(self.group_ids))
+
+    def follows(self, per_user):
+        """Подписки: читатели равномерны, авторы — по закону Ципфа."""
+        total, batch = 0, []
+        for user_id in self.user_ids:
+            for author_id in set(self._popular(per_user)) - {user_id}:
+                batch.append((user_id, author_id))
+            if len(batch) >= self.batch_size or user_id == self.user_ids[-1]:
+                with transaction.atomic():
+                    insert_rows(Follow, ('user', 'author'), batch)
+                total += len(batch)
+                batch = []
+                self.progress('follows', total)
+        return total
+
+    def _schedule(self, count):
+        """Пары (автор, время) по возрастанию времени, серии одного автора."""
+        mean_gap = (self.end - self.start) / max(count, 1)
+        burst_gap = mean_gap * BURST_GAP
+        quiet_gap = (mean_gap - BURST_PROBABILITY * burst_gap) / (
+            1 - BURST_PROBABILITY
+        )
+        moment, author_id = self.start, None
+        for _ in range(count):
+            if author_id is None or self.rng.random() > BURST_PROBABILITY:
+                author_id = self._popular(1)[0]
+                gap = quiet_gap
+            else:
+                gap = burst_gap
+            moment = min(moment + self.rng.expovariate(1 / gap), self.end)
+            yield author_id, moment
+
+    def _group(self, group_share):
+        if not self.group_ids or self.rng.random() >= group_share:
+            return None
+        return self.rng.choices(
+            self.group_ids, cum_weights=self.group_weights
+        )[0]
+
+    def posts(self, count, comments, group_share=0.5):
+        """Посты и комментарии к ним, пачка комментариев на пачку постов."""
+        per_post = comments / count if count else 0
+        post_id = self._last_id(Post)
+        comment_id = self._last_id(Comment)
+        total_posts = total_comments = 0
+        schedule = self._schedule(count)
+        while total_posts < count:
+            size = min(self.batch_size, count - total_posts)
+            posts = []
+            for author_id, moment in (next(schedule) for _ in range(size)):
+                post_id += 1
+                posts.append((post_id, author_id, moment))
+            comment_rows = self._comments(
+                posts, round(per_post * size), comment_id
+            )
+            with transaction.atomic():
+                insert_rows(Post, POST_FIELDS, (
+                    (pk, author_id, self._group(group_share), self._text(),
+                     self._date(moment), '', '', 0)
+                    for pk, author_id, moment in posts
+                ))
+                insert_rows(Comment, COMMENT_FIELDS, comment_rows)
+            comment_id += len(comment_rows)
+            total_posts += size
+            total_comments += len(comment_rows)
+            self.progress('posts', total_posts)
+        self.progress('comments', total_comments)
+        return total_posts, total_comments
+
+    def _comments(self, posts, count, last_id):
+        """Комментарии достаются постам с весами распределения Парето."""
+        if not posts or not count:
+            return []
+        weights = [self.rng.paretovariate(1.2) for _ in posts]
+        targets = self.rng.choices(posts, weights, k=count)
+        authors = self._popular(count)
+        return [
+            (last_id + number, post_id, author_id, self._text(),
+             self._date(min(
+                 moment + self.rng.expovariate(1 / COMMENT_DELAY), self.end
+             )))
+            for number, ((post_id, _, moment), author_id)
+            in enumerate(zip(targets, authors), start=1)
+        ]
+
+    def finish(self, rebuild_timelines=True, rebuild_search=True):
+        """Пересобирает то, что для одиночных записей ведут сигналы."""
+        counters.repair()
+        if rebuild_timelines:
+            self.progress('timelines', timelines.rebuild())
+        if rebuild_search:
+            self.progress('search', search.rebuild(self.batch_size))
+        versions.bump(versions.index(), versions.AUTHORS, versions.GROUPS)
@@ -0,0 +1,158 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import (
+    archives, counters, images, placeholders, search, thumbnails, timelines,
+    versions,
+)
+from .models import Comment, ExportArchive, Follow, Group, Post
+
+User = get_user_model()
+
+AUTHOR_DISPLAY_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_post(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.bump_post(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.author_id, 'followers_count', 1)
+        counters.bump_user(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, 'followers_count', -1)
+    counters.bump_user(instance.user_id, 'following_count', -1)
+
+
+@receiver(post_save, sender=Post)
+def push_to_timelines(sender, instance, created, **kwargs):
+    if created:
+        timelines.push_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        timelines.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    timelines.prune(instance.user_id, instance.author_id)
+    timelines.check_demotion(instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def index_post_text(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'text' in update_fields:
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post_text(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def queue_thumbnails(sender, instance, **kwargs):
+    if instance.image:
+        thumbnails.enqueue(instance.image.name)
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous(sender, instance, **kwargs):
+    instance._old_group_id, instance._old_image = None, ''
+    if instance.pk is not None:
+        instance._old_group_id, instance._old_image = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', 'image').first() or (None, '')
+
+
+@receiver(pre_save, sender=Post)
+def compute_image_color(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    if not instance.image:
+        instance.image_color = ''
+    elif not instance.image._committed:
+        instance.image_color = placeholders.image_color(instance)
+
+
+@receiver(post_save, sender=Post)
+def release_replaced_image(sender, instance, **kwargs):
+    old_image = getattr(instance, '_old_image', '')
+    if old_image and old_image != instance.image.name:
+        transaction.on_commit(lambda: images.release(old_image))
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    name = instance.image.name
+    if name:
+        transaction.on_commit(lambda: images.release(name))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(sender, instance, **kwargs):
+    groups = {instance.group_id, getattr(instance, '_old_group_id', None)}
+    versions.bump(
+        versions.index(),
+        versions.profile(instance.author_id),
+        *(versions.group(group_id) for group_id in groups if group_id),
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_feeds(sender, instance, **kwargs):
+    versions.bump(versions.GROUPS)
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_feeds(sender, instance, created, update_fields=None,
+                            **kwargs):
+    if created:
+        return
+    if update_fields and not AUTHOR_DISPLAY_FIELDS & set(update_fields):
+        return
+    versions.bump(versions.AUTHORS)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_feed(sender, instance, **kwargs):
+    versions.bump(
+        versions.follows(instance.user_id),
+        versions.follows(instance.author_id),
+    )
+
+
+@receiver(post_delete, sender=ExportArchive)
+def remove_archive_file(sender, instance, **kwargs):
+    archives.remove(instance)
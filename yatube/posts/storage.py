@@ -0,0 +1,118 @@
+"""Хранилище картинок постов, адресуемое по содержимому.
+
+Файл при загрузке пишется во временный файл и одновременно хешируется,
+а затем получает имя по SHA-256 содержимого. Одинаковые картинки
+хранятся один раз, и раз имя меняется вместе с содержимым, файл по
+адресу никогда не меняется и может кешироваться навсегда.
+
+Файлы раскладываются по двум уровням каталогов по первым символам
+хеша (posts/ab/cd/abcd….jpg), чтобы ни в одном каталоге не копились
+сотни тысяч файлов.
+"""
+import hashlib
+import os
+import posixpath
+import re
+import shutil
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASHED_NAME = re.compile(r'^[0-9a-f]{64}(\.[0-9a-z]+)?$')
+SHARDED_NAME = re.compile(
+    r'(^|/)([0-9a-f]{2})/([0-9a-f]{2})/\2\3[0-9a-f]{60}(\.[0-9a-z]+)?$'
+)
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def is_immutable(name):
+    """Задаёт ли имя файла его содержимое."""
+    return bool(HASHED_NAME.match(posixpath.basename(name)))
+
+
+def is_sharded(name):
+    """Лежит ли файл уже в раскладке по префиксам хеша."""
+    return bool(SHARDED_NAME.search(name))
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # Имя всё равно заменяется хешем, совпадение с чужим не страшно.
+        return name
+
+    def hashed_name(self, directory, digest, extension):
+        return posixpath.join(
+            directory, digest[:2], digest[2:4], f'{digest}{extension}'
+        )
+
+    def _place(self, temp_path, directory, digest, extension):
+        """Переносит готовый временный файл на место по хешу."""
+        name = self.hashed_name(directory, digest, extension)
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            os.unlink(temp_path)
+        else:
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            os.chmod(temp_path, self.file_permissions_mode or 0o644)
+            os.replace(temp_path, full_path)
+        return name
+
+    def _save(self, name, content):
+        directory, basename = posixpath.split(name)
+        extension = os.path.splitext(basename)[1].lower()
+        upload_dir = self.path(directory)
+        os.makedirs(upload_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=upload_dir, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    file.write(chunk)
+            return self._place(
+                temp_path, directory, digest.hexdigest(), extension
+            )
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def adopt(self, name, directory):
+        """Копирует существующий файл на место по хешу, возвращает имя.
+
+        Старый файл не трогается: на него ещё могут ссылаться страницы,
+        отданные до переноса.
+        """
+        extension = os.path.splitext(name)[1].lower()
+        digest = self.digest(name)
+        upload_dir = self.path(directory)
+        os.makedirs(upload_dir, exist_ok=True)
+        temp_path = os.path.join(upload_dir, f'.adopt-{os.getpid()}-{digest}')
+        try:
+            try:
+                os.link(self.path(name), temp_path)
+            except OSError:
+                shutil.copyfile(self.path(name), temp_path)
+            return self._place(temp_path, directory, digest, extension)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def adopted_name(self, name, directory):
+        """Имя копии файла на месте по хешу или None, если её ещё нет."""
+        extension = os.path.splitext(name)[1].lower()
+        new_name = self.hashed_name(directory, self.digest(name), extension)
+        return new_name if self.exists(new_name) else None
+
+    def digest(self, name):
+        """SHA-256 содержимого файла в шестнадцатеричном виде."""
+        digest = hashlib.sha256()
+        with self.open(name) as file:
+            for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
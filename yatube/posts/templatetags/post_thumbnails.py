@@ -0,0 +1,44 @@
+from django import template
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+def _srcset(variants):
+    return ', '.join(f'{im.url} {im.width}w' for im in variants)
+
+
+@register.inclusion_tag('posts/includes/post_picture.html')
+def post_picture(image, sizes=thumbnails.FEED_SIZES, color=''):
+    """Картинка поста со srcset из готовых вариантов или оригинал.
+
+    Варианты шире исходника не предлагаются: они лишь растянуты. Пока
+    картинка грузится, на её месте фон цвета color.
+    """
+    context = {
+        'image': image, 'sizes': sizes, 'color': color,
+        'ratio': thumbnails.FEED_RATIO,
+    }
+    if not image:
+        return context
+    found = thumbnails.ready_variants(image)
+    fallback = thumbnails.ready(image)
+    if fallback is None:
+        return context
+    source = default.kvstore.get(ImageFile(image))
+    if source is not None:
+        found = {
+            format_: [im for im in variants
+                      if im.width <= source.width] or variants[:1]
+            for format_, variants in found.items()
+        }
+    context['fallback'] = fallback
+    context['sources'] = [
+        (f'image/{format_.lower()}', _srcset(variants))
+        for format_, variants in found.items() if format_ != 'JPEG'
+    ]
+    context['srcset'] = _srcset(found.get('JPEG', [fallback]))
+    return context
@@ -0,0 +1,72 @@
+import io
+import json
+import shutil
+import tempfile
+import zipfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, ExportArchive, Follow, Post
+from .utils import make_jpeg
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_ARCHIVES_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT,
+                   EXPORT_ARCHIVES_ROOT=TEMP_ARCHIVES_ROOT)
+class ExportArchiveTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='owner')
+        cls.other = User.objects.create_user(username='other')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(TEMP_ARCHIVES_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_archive_is_built_in_background_and_downloaded(self):
+        """Архив собирается воркером и отдаётся владельцу"""
+        post = Post.objects.create(
+            author=self.user, text='Моя запись', image=make_jpeg()
+        )
+        Comment.objects.create(post=post, author=self.user, text='Мой ответ')
+        Follow.objects.create(user=self.user, author=self.other)
+        self.client.post(reverse('posts:archive'))
+        self.client.post(reverse('posts:archive'))
+        archive = ExportArchive.objects.get()
+        self.assertEqual(archive.status, ExportArchive.PENDING)
+
+        call_command('process_archives', '--once', stdout=StringIO())
+        archive.refresh_from_db()
+        self.assertEqual(archive.status, ExportArchive.READY)
+        url = reverse('posts:archive_download', args=[archive.pk])
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content)
+        response.close()
+        with zipfile.ZipFile(io.BytesIO(content)) as archive_file:
+            posts = json.loads(archive_file.read('posts.json'))
+            follows = json.loads(archive_file.read('follows.json'))
+            image = archive_file.read(f'images/{post.image.name}')
+        self.assertEqual([row['text'] for row in posts], ['Моя запись'])
+        self.assertEqual(follows[0]['author'], 'other')
+        with post.image.open('rb') as file:
+            self.assertEqual(image, file.read())
+
+        stranger = Client()
+        stranger.force_login(self.other)
+        self.assertEqual(stranger.get(url).status_code, 404)
@@ -0,0 +1,57 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class BenchmarkViewsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        post = Post.objects.create(author=author, group=group, text='Пост')
+        Comment.objects.create(post=post, author=reader, text='Ответ')
+        Follow.objects.create(user=reader, author=author)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.output = os.path.join(directory.name, 'views.json')
+
+    def test_results_are_written_and_compared(self):
+        stdout = StringIO()
+        call_command('benchmark_views', requests=2, output=self.output,
+                     stdout=stdout)
+        with open(self.output) as file:
+            results = json.load(file)
+        self.assertEqual(set(results), {
+            'index', 'group_posts', 'profile', 'post_detail', 'follow_index'
+        })
+        self.assertEqual(set(results['index']), {'cold', 'warm', 'untimed'})
+        self.assertIn('index цена Server-Timing:', stdout.getvalue())
+        stats = results['post_detail']['warm']
+        self.assertGreater(stats['bytes'], 0)
+        self.assertGreater(stats['queries'], 0)
+        self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+
+        for scenarios in results.values():
+            for stats in scenarios.values():
+                stats['p50_ms'] = stats['p95_ms'] = stats['p99_ms'] = 0.0
+        with open(self.output, 'w') as file:
+            json.dump(results, file)
+        with self.assertRaises(CommandError):
+            call_command('benchmark_views', requests=2,
+                         baseline=self.output, stdout=StringIO(),
+                         stderr=StringIO())
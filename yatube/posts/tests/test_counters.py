@@ -0,0 +1,90 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Post, UserCounters
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Текст')
+
+    def counters(self, user):
+        return UserCounters.objects.get(user=user)
+
+    def test_counters_follow_creates_and_deletes(self):
+        """Счётчики меняются при создании и удалении объектов"""
+        comment = Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(self.counters(self.author).posts_count, 1)
+        self.assertEqual(self.counters(self.author).followers_count, 1)
+        self.assertEqual(self.counters(self.user).following_count, 1)
+        comment.delete()
+        follow.delete()
+        Post.objects.create(author=self.author, text='Второй')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        self.assertEqual(self.counters(self.author).posts_count, 2)
+        self.assertEqual(self.counters(self.author).followers_count, 0)
+        self.assertEqual(self.counters(self.user).following_count, 0)
+
+    def test_counters_do_not_go_below_zero(self):
+        """Удаление при отставшем нулевом счётчике не ломает запись"""
+        comment = Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        Post.objects.update(comments_count=0)
+        UserCounters.objects.update(followers_count=0, following_count=0)
+        comment.delete()
+        follow.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        self.assertEqual(self.counters(self.author).followers_count, 0)
+        self.assertEqual(self.counters(self.user).following_count, 0)
+
+    def test_repair_command_recomputes_counters(self):
+        """Команда repair_counters пересчитывает испорченные счётчики"""
+        Comment.objects.create(post=self.post, author=self.user, text='1')
+        Follow.objects.create(user=self.user, author=self.author)
+        UserCounters.objects.all().delete()
+        Post.objects.update(comments_count=7)
+        call_command('repair_counters', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(self.counters(self.author).posts_count, 1)
+        self.assertEqual(self.counters(self.author).followers_count, 1)
+        self.assertEqual(self.counters(self.user).following_count, 1)
+        self.assertEqual(self.counters(self.user).posts_count, 0)
+
+    def test_profile_and_detail_do_not_count(self):
+        """Профиль и страница поста не выполняют COUNT(*)"""
+        client = Client()
+        client.force_login(self.user)
+        names = [
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        ]
+        for name in names:
+            with self.subTest(name=name):
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    response = client.get(name)
+                self.assertEqual(response.context['post_count'], 1)
+                for query in queries:
+                    self.assertNotIn('COUNT(', query['sql'])
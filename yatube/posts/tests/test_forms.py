@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -82,7 +83,9 @@ class PostCreateFormTest(TestCase):
             text='Тестовый текст',
             group=self.post.group,
             author=self.post.author,
-            image='posts/small.gif'
+            image=Post.image.field.storage.hashed_name(
+                'posts', hashlib.sha256(small_gif).hexdigest(), '.gif'
+            )
         ).exists())
 
     def test_edit_post(self):
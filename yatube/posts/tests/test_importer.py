@@ -0,0 +1,106 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .. import counters, search
+from ..models import Follow, Group, Post, ThumbnailTask, TimelineEntry
+from .utils import make_jpeg
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImportPostsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def write(self, name, lines):
+        path = os.path.join(self.dir, name)
+        with open(path, 'a', encoding='utf-8') as file:
+            file.writelines(f'{line}\n' for line in lines)
+        return path
+
+    def run_import(self, path, *args):
+        stderr = StringIO()
+        call_command('import_posts', path, *args,
+                     stdout=StringIO(), stderr=stderr)
+        return stderr.getvalue()
+
+    def test_jsonl_import_keeps_derived_data_in_sync(self):
+        """Импорт обновляет счётчики, ленты и поиск, сохраняя даты"""
+        path = self.write('posts.jsonl', [
+            json.dumps({'author': 'author', 'text': 'Перенесённый пингвин',
+                        'group': 'group',
+                        'pub_date': '2020-05-01T10:00:00+00:00'}),
+            json.dumps({'author': 'nobody', 'text': 'Без автора'}),
+            json.dumps({'author': 'author', 'text': 'Второй'}),
+        ])
+        errors = self.run_import(path, '--batch-size', '2')
+
+        self.assertIn('Строка 2', errors)
+        post = Post.objects.get(text='Перенесённый пингвин')
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(post.pub_date.year, 2020)
+        self.assertEqual(counters.of(User.objects.get(pk=self.author.pk))
+                         .posts_count, 2)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2
+        )
+        self.assertEqual(
+            list(Post.objects.filter(pk__in=search.post_ids('пингвин'))),
+            [post],
+        )
+
+    def test_rerun_continues_after_last_committed_row(self):
+        """Повторный запуск не дублирует уже импортированные строки"""
+        path = self.write('posts.jsonl', [
+            json.dumps({'author': 'author', 'text': 'Первый'}),
+        ])
+        self.run_import(path)
+        self.write('posts.jsonl', [
+            json.dumps({'author': 'author', 'text': 'Дописанный'}),
+        ])
+        self.run_import(path)
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            ['Дописанный', 'Первый'],
+        )
+
+    def test_csv_import_attaches_images(self):
+        """Картинки из каталога сохраняются и ставятся в очередь"""
+        with open(os.path.join(self.dir, 'photo.jpg'), 'wb') as file:
+            file.write(make_jpeg().read())
+        path = self.write('posts.csv', [
+            'author,text,image',
+            'author,С картинкой,photo.jpg',
+        ])
+        self.run_import(path, '--images', self.dir)
+        post = Post.objects.get()
+        self.assertTrue(post.image.storage.exists(post.image.name))
+        self.assertTrue(post.image_color.startswith('#'))
+        self.assertTrue(
+            ThumbnailTask.objects.filter(name=post.image.name).exists()
+        )
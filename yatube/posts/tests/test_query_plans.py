@@ -0,0 +1,137 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from ..paginators import encode_cursor
+
+User = get_user_model()
+
+# Проход по таблице без индекса или сортировка во временном B-дереве:
+# такой запрос дорожает вместе с таблицей.
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\w+$')
+TEMP_SORT = 'USE TEMP B-TREE'
+# Условие на ключ курсора из posts.paginators.seek:
+# a <= %s AND (a < %s OR ...).
+CURSOR_CONDITION = re.compile(
+    r'("\w+"\."\w+") [<>]= %s AND \(\1 [<>] %s OR'
+)
+# Такую страницу нужно искать по индексу с границей по ключу курсора:
+# SCAN ... USING INDEX проходит индекс с начала до нужной записи.
+SEEK_RANGE = re.compile(
+    r'^SEARCH \w+ USING (COVERING )?INDEX \w+ \((\w+=\? AND )*\w+[<>]\?\)'
+)
+FEEDS = (
+    ('posts:index', {}),
+    ('posts:group_list', {'slug': 'group'}),
+    ('posts:profile', {'username': 'author'}),
+    ('posts:follow_index', {}),
+)
+
+
+class QueryPlanTest(TestCase):
+    """Планы SQLite для запросов лент из posts.views.
+
+    Проверяется курсорный режим, который работает по умолчанию. Режим
+    ?page=N намеренно считает COUNT(*) и оставлен для малых таблиц,
+    а поиск сортирует по релевантности только найденные посты.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост автора'
+        )
+        Comment.objects.create(post=cls.post, author=cls.reader, text='Ответ')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def plans(self, url, params=None):
+        """Пары (SQL, строки плана) для SELECT-запросов страницы.
+
+        План строится для запроса с параметрами, как он выполняется:
+        с подставленными значениями SQLite иногда выбирает другой.
+        """
+        queries = []
+
+        def capture(execute, sql, sql_params, many, context):
+            queries.append((sql, sql_params))
+            return execute(sql, sql_params, many, context)
+
+        with connection.execute_wrapper(capture):
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        with connection.cursor() as cursor:
+            for sql, sql_params in queries:
+                if not sql.startswith('SELECT'):
+                    continue
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', sql_params)
+                yield sql, [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexed(self, url, params=None):
+        """Без полных проходов и сортировок; после курсора — диапазон."""
+        seeks = 0
+        for sql, plan in self.plans(url, params):
+            with self.subTest(url=url, sql=sql):
+                for step in plan:
+                    self.assertNotRegex(step, FULL_SCAN)
+                    self.assertNotIn(TEMP_SORT, step)
+                if params and CURSOR_CONDITION.search(sql):
+                    seeks += 1
+                    self.assertFalse(
+                        [step for step in plan if step.startswith('SCAN ')],
+                        plan,
+                    )
+                    self.assertTrue(
+                        any(SEEK_RANGE.match(step) for step in plan), plan
+                    )
+        if params and 'cursor' in params:
+            self.assertTrue(seeks, f'{url}: нет запроса после курсора')
+
+    def deep_cursor(self, *prefix):
+        """Курсор на самом старом посте — самая глубокая страница ленты."""
+        oldest = Post.objects.order_by('pub_date', 'pk').first()
+        return {
+            'cursor': encode_cursor([*prefix, oldest.pub_date, oldest.pk])
+        }
+
+    def test_feeds_use_indexes(self):
+        for name, kwargs in FEEDS:
+            self.assertIndexed(reverse(name, kwargs=kwargs))
+
+    def test_deep_cursor_seeks_by_range(self):
+        """Курсор в глубине ленты ищется диапазоном, в обе стороны"""
+        Post.objects.bulk_create(
+            Post(author=self.author, group=self.group, text=str(i))
+            for i in range(20)
+        )
+        for name, kwargs in FEEDS:
+            url = reverse(name, kwargs=kwargs)
+            self.assertIndexed(url, self.deep_cursor())
+            self.assertIndexed(url, self.deep_cursor('prev'))
+
+    def test_post_and_comments_use_indexes(self):
+        kwargs = {'post_id': self.post.pk}
+        self.assertIndexed(reverse('posts:post_detail', kwargs=kwargs))
+        self.assertIndexed(reverse('posts:post_comments', kwargs=kwargs))
+        comment = self.post.comments.order_by('-created', '-pk').first()
+        self.assertIndexed(
+            reverse('posts:post_comments', kwargs=kwargs),
+            {'cursor': encode_cursor([comment.created, comment.pk])},
+        )
+
+    def test_archives_use_indexes(self):
+        self.assertIndexed(reverse('posts:archive'))
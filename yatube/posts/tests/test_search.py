@@ -0,0 +1,70 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.rare = Post.objects.create(author=cls.user, text='Кот спит')
+        cls.often = Post.objects.create(
+            author=cls.user, text='Кот, кот и ещё раз КОТ'
+        )
+        Post.objects.create(author=cls.user, text='Собака лает')
+
+    def search(self, query, **params):
+        response = Client().get(
+            reverse('posts:search'), {'q': query, **params}
+        )
+        return response.context['page_obj']
+
+    def test_results_are_ranked(self):
+        """Найденные посты упорядочены по релевантности"""
+        self.assertEqual(list(self.search('кот')), [self.often, self.rare])
+
+    def test_index_follows_edit_and_delete(self):
+        """Индекс обновляется при редактировании и удалении поста"""
+        post = Post.objects.get(pk=self.rare.pk)
+        post.text = 'Попугай молчит'
+        post.save()
+        self.assertEqual(list(self.search('попугай')), [post])
+        self.assertEqual(list(self.search('кот')), [self.often])
+        post.delete()
+        self.assertEqual(list(self.search('попугай')), [])
+
+    def test_cursor_keeps_query(self):
+        """Курсорные страницы поиска продолжают тот же запрос"""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Кот номер {i}') for i in range(12)
+        )
+        call_command('rebuild_search_index', stdout=StringIO())
+        first = self.search('кот')
+        response = Client().get(reverse('posts:search'), {'q': 'кот'})
+        self.assertContains(response, 'q=%D0%BA%D0%BE%D1%82&amp;cursor=')
+        second = self.search('кот', cursor=first.paginator.next_cursor)
+        self.assertEqual(len(first) + len(second), 14)
+        self.assertFalse(set(first) & set(second))
+
+    def test_fts_syntax_is_escaped(self):
+        """Служебные символы FTS5 в запросе не ломают поиск"""
+        self.assertEqual(list(self.search('кот" OR (')), [])
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке находит посты через индекс"""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'собака'}
+        )
+        self.assertEqual(response.context['cl'].result_count, 1)
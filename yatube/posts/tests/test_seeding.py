@@ -0,0 +1,51 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TestCase
+
+from .. import search
+from ..models import Comment, Follow, Group, Post, TimelineEntry, UserCounters
+
+User = get_user_model()
+
+
+class SeedCommandTest(TestCase):
+    def test_seed_creates_consistent_data(self):
+        call_command(
+            'seed', users=30, groups=3, posts=500, comments=800,
+            follows_per_user=5, days=30, seed=1, stdout=StringIO(),
+        )
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 500)
+        self.assertEqual(Comment.objects.count(), 800)
+        self.assertTrue(Follow.objects.exists())
+        self.assertEqual(
+            UserCounters.objects.aggregate(Sum('posts_count')),
+            {'posts_count__sum': 500},
+        )
+        self.assertEqual(
+            Post.objects.aggregate(Sum('comments_count')),
+            {'comments_count__sum': 800},
+        )
+        dates = list(
+            Post.objects.order_by('pk').values_list('pub_date', flat=True)
+        )
+        self.assertEqual(dates, sorted(dates))
+        self.assertGreater(dates[-1] - dates[0], dates[1] - dates[0])
+        self.assertTrue(TimelineEntry.objects.exists())
+        word = Post.objects.first().text.split()[0]
+        self.assertTrue(search.matching(word).exists())
+
+    def test_followers_are_skewed(self):
+        call_command(
+            'seed', users=200, groups=0, posts=0, comments=0,
+            follows_per_user=10, seed=1, skip_timelines=True,
+            skip_search=True, stdout=StringIO(),
+        )
+        followers = sorted(UserCounters.objects.values_list(
+            'followers_count', flat=True
+        ), reverse=True)
+        self.assertGreater(followers[0], 10 * followers[len(followers) // 2])
@@ -0,0 +1,124 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import (
+    RequestFactory, TestCase, TransactionTestCase, override_settings
+)
+
+from core.views import media
+from .utils import make_jpeg
+from ..models import Post
+from ..storage import is_sharded
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+RELEASE_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_same_content_is_stored_once(self):
+        """Одинаковые картинки хранятся одним файлом с именем по хешу"""
+        upload = make_jpeg('first.jpg')
+        digest = hashlib.sha256(upload.read()).hexdigest()
+        first = Post.objects.create(
+            author=self.user, text='Первый', image=upload
+        )
+        second = Post.objects.create(
+            author=self.user, text='Второй', image=make_jpeg('second.JPG')
+        )
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(
+            first.image.name, f'posts/{digest[:2]}/{digest[2:4]}/{digest}.jpg'
+        )
+        self.assertEqual(
+            os.listdir(os.path.dirname(first.image.path)),
+            [os.path.basename(first.image.name)],
+        )
+
+    def test_shard_images_moves_legacy_files(self):
+        """Команда переносит старые файлы в каталоги по хешу"""
+        content = make_jpeg().read()
+        legacy_names = ['posts/old.jpg', 'posts/old_copy.jpg']
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts'), exist_ok=True)
+        for name in legacy_names:
+            with open(os.path.join(TEMP_MEDIA_ROOT, name), 'wb') as file:
+                file.write(content)
+            Post.objects.create(author=self.user, text=name, image=name)
+        call_command('shard_images', '--batch-size', '1', stdout=StringIO())
+
+        names = set(Post.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertTrue(is_sharded(name))
+        with open(os.path.join(TEMP_MEDIA_ROOT, name), 'rb') as file:
+            self.assertEqual(file.read(), content)
+        for legacy_name in legacy_names:
+            self.assertTrue(
+                os.path.exists(os.path.join(TEMP_MEDIA_ROOT, legacy_name))
+            )
+        call_command('shard_images', '--delete-old', stdout=StringIO())
+        for legacy_name in legacy_names:
+            self.assertFalse(
+                os.path.exists(os.path.join(TEMP_MEDIA_ROOT, legacy_name))
+            )
+
+    def test_delete_old_keeps_referenced_files(self):
+        """Старый файл не удаляется, если пост снова сослался на него"""
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts'), exist_ok=True)
+        name = 'posts/edited.jpg'
+        with open(os.path.join(TEMP_MEDIA_ROOT, name), 'wb') as file:
+            file.write(make_jpeg().read())
+        post = Post.objects.create(author=self.user, text='Текст', image=name)
+        call_command('shard_images', stdout=StringIO())
+        # Форма правки, открытая до переноса, сохраняет старое имя.
+        Post.objects.filter(pk=post.pk).update(image=name)
+        call_command('shard_images', '--delete-old', stdout=StringIO())
+        self.assertTrue(os.path.exists(os.path.join(TEMP_MEDIA_ROOT, name)))
+
+    def test_hashed_media_is_immutable(self):
+        """Файлы с хешем в имени отдаются с Cache-Control: immutable"""
+        post = Post.objects.create(
+            author=self.user, text='Картинка', image=make_jpeg()
+        )
+        response = media(RequestFactory().get('/'), post.image.name)
+        self.assertIn('immutable', response['Cache-Control'])
+
+
+@override_settings(MEDIA_ROOT=RELEASE_MEDIA_ROOT)
+class ImageReleaseTest(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(RELEASE_MEDIA_ROOT, ignore_errors=True)
+
+    def test_file_is_removed_with_last_reference(self):
+        """Файл удаляется только вместе с последним постом"""
+        user = User.objects.create_user(username='author')
+        first = Post.objects.create(
+            author=user, text='Первый', image=make_jpeg('a.jpg')
+        )
+        second = Post.objects.create(
+            author=user, text='Второй', image=make_jpeg('b.jpg')
+        )
+        path = first.image.path
+        first.delete()
+        self.assertTrue(os.path.exists(path))
+        second.delete()
+        self.assertFalse(os.path.exists(path))
@@ -0,0 +1,166 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from sorl.thumbnail.images import ImageFile
+
+from .. import thumbnails
+from ..engines import DraftEngine
+from ..models import Post, ThumbnailTask
+from .utils import make_jpeg
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+COLOR_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailQueueTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # Одинаковые картинки делят файл, а хранилище ключей sorl
+        # кеширует записи мимо отката транзакций.
+        cache.clear()
+
+    def test_request_shows_original_until_thumbnail_is_ready(self):
+        """Запрос не строит миниатюру, пока её не построит очередь"""
+        post = Post.objects.create(
+            author=self.user, text='С картинкой', image=make_jpeg()
+        )
+        self.assertTrue(
+            ThumbnailTask.objects.filter(name=post.image.name).exists()
+        )
+        url = reverse('posts:post_detail', kwargs={'post_id': post.id})
+        response = Client().get(url)
+        self.assertContains(response, post.image.url)
+        index = Client().get(reverse('posts:index'))
+        self.assertNotContains(index, '/media/cache/')
+        self.assertFalse(
+            os.path.exists(os.path.join(TEMP_MEDIA_ROOT, 'cache'))
+        )
+
+        call_command('process_thumbnails', '--once', stdout=StringIO())
+        self.assertFalse(ThumbnailTask.objects.exists())
+        response = Client().get(url)
+        self.assertContains(response, '/media/cache/')
+        self.assertContains(response, 'width="960" height="339"')
+        self.assertContains(response, ' 640w, ')
+        self.assertNotContains(response, ' 1920w')
+        index = Client().get(reverse('posts:index'))
+        self.assertContains(index, '/media/cache/')
+
+    def test_variants_cover_every_width_and_format(self):
+        """Для каждой ширины и формата строится свой вариант"""
+        post = Post.objects.create(
+            author=self.user, text='Варианты', image=make_jpeg('wide.jpg')
+        )
+        self.addCleanup(shutil.rmtree, os.path.join(TEMP_MEDIA_ROOT, 'cache'),
+                        ignore_errors=True)
+        thumbnails.generate(post.image.name)
+        found = thumbnails.ready_variants(post.image.name)
+        self.assertEqual(set(found), set(thumbnails.FEED_FORMATS))
+        for variants in found.values():
+            self.assertEqual(
+                [im.width for im in variants], list(thumbnails.FEED_WIDTHS)
+            )
+
+    def test_backfill_builds_missing_thumbnails_and_resumes(self):
+        """Бэкфилл строит миниатюры и продолжает с контрольной точки"""
+        post = Post.objects.create(
+            author=self.user, text='Старый пост', image=make_jpeg('old.jpg')
+        )
+        ThumbnailTask.objects.all().delete()
+        self.addCleanup(shutil.rmtree, os.path.join(TEMP_MEDIA_ROOT, 'cache'),
+                        ignore_errors=True)
+        index = reverse('posts:index')
+        self.assertNotContains(Client().get(index), '/media/cache/')
+        checkpoint = os.path.join(TEMP_MEDIA_ROOT, 'backfill.checkpoint')
+        call_command('backfill_thumbnails', '--workers', '1',
+                     '--checkpoint', checkpoint, stdout=StringIO())
+        self.assertTrue(thumbnails.all_ready(post.image.name))
+        self.assertContains(Client().get(index), '/media/cache/')
+        with open(checkpoint) as file:
+            self.assertEqual(file.read(), str(post.id))
+
+        out = StringIO()
+        call_command('backfill_thumbnails', '--workers', '1',
+                     '--checkpoint', checkpoint, stdout=out)
+        self.assertIn('построено 0', out.getvalue())
+
+
+class DraftEngineTest(TestCase):
+    def test_jpeg_is_decoded_at_reduced_scale(self):
+        """JPEG декодируется уменьшенным, но не меньше миниатюры"""
+        storage = FileSystemStorage(location=tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, storage.location)
+        name = storage.save('large.jpg', make_jpeg(size=(4000, 3000)))
+        engine = DraftEngine()
+        image = engine.get_image(ImageFile(name, storage))
+        self.addCleanup(engine.cleanup, image)
+        options = thumbnails.QueuedThumbnailBackend()._full_options(
+            ImageFile(name, storage), thumbnails.FEED_OPTIONS
+        )
+        thumbnail = engine.create(image, (320, 113), options)
+        self.assertEqual(thumbnail.size, (320, 113))
+        self.assertEqual(image.size, (500, 375))
+
+
+@override_settings(MEDIA_ROOT=COLOR_MEDIA_ROOT)
+class ImageColorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(COLOR_MEDIA_ROOT, ignore_errors=True)
+
+    def test_color_is_computed_on_upload(self):
+        """Цвет-заглушка считается при загрузке и попадает в шаблон"""
+        post = Post.objects.create(
+            author=self.user, text='Красная', image=make_jpeg()
+        )
+        red, green, blue = (int(post.image_color[i:i + 2], 16)
+                            for i in (1, 3, 5))
+        self.assertAlmostEqual(red, 200, delta=8)
+        self.assertAlmostEqual(green, 30, delta=8)
+        self.assertAlmostEqual(blue, 30, delta=8)
+        response = Client().get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id})
+        )
+        self.assertContains(response, f'background-color: {post.image_color}')
+
+    def test_backfill_fills_missing_colors(self):
+        """Команда досчитывает цвета для старых постов"""
+        post = Post.objects.create(
+            author=self.user, text='Старая', image=make_jpeg()
+        )
+        Post.objects.filter(pk=post.pk).update(image_color='')
+        cache.clear()
+        index = reverse('posts:index')
+        self.assertNotContains(Client().get(index), 'background-color: #')
+        call_command('backfill_placeholders', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertTrue(post.image_color.startswith('#'))
+        self.assertContains(
+            Client().get(index), f'background-color: {post.image_color}'
+        )
@@ -0,0 +1,136 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import timelines
+from ..models import Follow, Post, TimelineEntry, TimelineTask
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.old_post = Post.objects.create(author=cls.author, text='Старый')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def feed(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Подписка переносит посты автора в ленту, отписка убирает"""
+        self.client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.author}
+        ))
+        self.assertEqual(self.feed(), [self.old_post])
+        self.client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': self.author}
+        ))
+        self.assertEqual(self.feed(), [])
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_new_post_is_pushed_to_followers(self):
+        """Новый пост попадает в ленты подписчиков"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Новый')
+        self.assertEqual(self.feed(), [new_post, self.old_post])
+
+    def test_rebuild_command_restores_timelines(self):
+        """Команда rebuild_timelines пересобирает ленты с нуля"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(self.feed(), [self.old_post])
+
+
+class HybridTimelineTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.fan = User.objects.create_user(username='fan')
+        cls.star = User.objects.create_user(username='star')
+        cls.author = User.objects.create_user(username='author')
+        Follow.objects.create(user=cls.fan, author=cls.star)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def feed(self, **params):
+        response = self.client.get(reverse('posts:follow_index'), params)
+        return response.context['page_obj']
+
+    @override_settings(TIMELINE_CELEBRITY_FOLLOWERS=2)
+    def test_celebrity_posts_are_pulled_and_merged(self):
+        """Посты «звезды» не рассылаются, но сливаются в ленту по дате"""
+        Follow.objects.create(user=self.reader, author=self.star)
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(author=author, text=str(i))
+            for i, author in enumerate([self.star, self.author] * 6)
+        ]
+        self.assertFalse(
+            TimelineEntry.objects.filter(post__author=self.star).exists()
+        )
+        first = self.feed()
+        second = self.feed(cursor=first.paginator.next_cursor)
+        self.assertEqual(list(first) + list(second), posts[::-1])
+
+    @override_settings(TIMELINE_CELEBRITY_FOLLOWERS=2)
+    def test_pushed_and_pulled_post_is_shown_once(self):
+        """Пост, попавший и в ленту, и в выборку «звезды», виден один раз"""
+        post = Post.objects.create(author=self.star, text='Ранний пост')
+        TimelineEntry.objects.create(
+            user=self.reader, post=post, pub_date=post.pub_date
+        )
+        Follow.objects.create(user=self.reader, author=self.star)
+        self.assertEqual(list(self.feed()), [post])
+
+    @override_settings(TIMELINE_CELEBRITY_FOLLOWERS=3)
+    def test_demoted_celebrity_posts_stay_in_feed(self):
+        """Посты автора, опустившегося ниже порога, остаются в ленте"""
+        other_fan = User.objects.create_user(username='other_fan')
+        Follow.objects.create(user=other_fan, author=self.star)
+        Follow.objects.create(user=self.reader, author=self.star)
+        post = Post.objects.create(author=self.star, text='Пост звезды')
+        self.assertFalse(TimelineEntry.objects.exists())
+        Follow.objects.filter(user=other_fan, author=self.star).delete()
+        self.assertEqual(list(self.feed()), [post])
+        self.assertFalse(TimelineTask.objects.exists())
+        Follow.objects.filter(user=self.fan, author=self.star).delete()
+        self.assertTrue(TimelineTask.objects.filter(author=self.star).exists())
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(list(self.feed()), [post])
+        call_command('process_timelines', '--once', stdout=StringIO())
+        self.assertFalse(TimelineTask.objects.exists())
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=post
+        ).exists())
+        self.assertEqual(list(self.feed()), [post])
+
+    @override_settings(TIMELINE_CELEBRITY_FOLLOWERS=3)
+    def test_author_near_threshold_is_pushed_and_pulled(self):
+        """Между порогами посты и рассылаются, и собираются при чтении"""
+        Follow.objects.create(user=self.reader, author=self.star)
+        post = Post.objects.create(author=self.star, text='Пост')
+        self.assertTrue(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(timelines.celebrities_followed_by(self.reader),
+                         [self.star.pk])
+        self.assertEqual(list(self.feed()), [post])
+
+    @override_settings(TIMELINE_CELEBRITY_FOLLOWERS=0)
+    def test_pull_only_mode_keeps_timelines_empty(self):
+        """При нулевом пороге ленты собираются только при чтении"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Текст')
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(list(self.feed()), [post])
@@ -0,0 +1,89 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import uploads
+from ..models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_upload(size, name='photo.jpg', exif=None):
+    buffer = BytesIO()
+    image = Image.new('RGB', size, (10, 120, 200))
+    if exif:
+        image.save(buffer, 'JPEG', exif=exif)
+    else:
+        image.save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageUploadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def create(self, image):
+        return self.client.post(
+            reverse('posts:post_create'),
+            {'text': 'С картинкой', 'image': image},
+        )
+
+    def test_oversized_upload_is_rejected(self):
+        """Файл сверх лимита по байтам не принимается"""
+        with mock.patch.object(uploads, 'MAX_BYTES', 1000):
+            response = self.create(make_upload((400, 400)))
+        self.assertFormError(
+            response, 'form', 'image', 'Файл больше 0 МБ.'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    def test_too_many_pixels_are_rejected(self):
+        """Картинка сверх лимита пикселей не декодируется и не принимается"""
+        with mock.patch.object(uploads, 'MAX_PIXELS', 100 * 100):
+            response = self.create(make_upload((200, 200)))
+        self.assertEqual(
+            response.context['form'].errors['image'][0],
+            'Картинка больше 0 мегапикселей.',
+        )
+        self.assertFalse(Post.objects.exists())
+
+    def test_large_image_is_downscaled_without_exif(self):
+        """Большая картинка уменьшается, EXIF вырезается"""
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        with mock.patch.object(uploads, 'MAX_SIDE', 300):
+            self.create(make_upload((1200, 600), exif=exif.tobytes()))
+        post = Post.objects.get()
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (300, 150))
+            self.assertNotIn('exif', image.info)
+
+    def test_small_image_is_stored_as_is(self):
+        """Небольшая картинка без EXIF сохраняется без перекодирования"""
+        upload = make_upload((200, 100))
+        content = upload.read()
+        upload.seek(0)
+        self.create(upload)
+        with Post.objects.get().image.open('rb') as file:
+            self.assertEqual(file.read(), content)
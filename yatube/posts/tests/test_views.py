@@ -1,15 +1,21 @@
 import shutil
 import tempfile
+import time
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django import forms
 
-from ..models import Post, Group, Follow
+from .. import versions
+from ..models import Post, Group, Follow, Comment
+from ..paginators import COMMENTS_PER_PAGE, encode_cursor
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -201,21 +207,72 @@ class PostViewsTest(BaseTest):
                                  post_wth_pic.image.name)
 
     def test_cache_index_page(self):
-        cache1 = self.guest_client.get(
-            reverse('posts:index')
-        ).content
-        Post.objects.create(
-            text='Новый текст для кеша',
-            author=self.user,
-        )
-        cache2 = self.guest_client.get(
-            reverse('posts:index')
-        ).content
-        self.assertEqual(cache1, cache2)
-        cache.clear()
-        self.assertNotEqual(cache2, self.guest_client.get(
-            reverse('posts:index')
-        ).content)
+        """Фрагмент ленты кешируется и сбрасывается при изменении поста"""
+        for name in self.url_names:
+            with self.subTest(name=name):
+                cache1 = self.guest_client.get(name).content
+                Post.objects.filter(pk=self.post.pk).update(
+                    text='Изменено в обход сигналов'
+                )
+                cache2 = self.guest_client.get(name).content
+                self.assertEqual(cache1, cache2)
+                Post.objects.create(
+                    text='Новый текст для кеша',
+                    author=self.user,
+                    group=self.group,
+                )
+                self.assertNotEqual(
+                    cache2, self.guest_client.get(name).content
+                )
+
+    def test_cache_follows_author_and_group_changes(self):
+        """Фрагменты сбрасываются при смене имени автора и группы"""
+        user = User.objects.get(pk=self.user.pk)
+        for name in self.url_names:
+            with self.subTest(name=name):
+                self.guest_client.get(name)
+                user.first_name = f'Имя для {name}'
+                user.save()
+                self.assertIn(
+                    user.first_name,
+                    self.guest_client.get(name).content.decode(),
+                )
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'new_slug'
+        group.save()
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertIn('/group/new_slug/', response.content.decode())
+
+    def test_process_local_cache_keeps_fragments_short(self):
+        """С кешем внутри процесса фрагменты живут недолго"""
+        self.assertFalse(versions.shared())
+        self.assertEqual(versions.timeout(), versions.LOCAL_TIMEOUT)
+        shared_cache = {'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        }}
+        with override_settings(CACHES=shared_cache):
+            self.assertTrue(versions.shared())
+            self.assertEqual(
+                versions.timeout(), settings.FEED_CACHE_TIMEOUT
+            )
+
+    def test_shared_cache_keeps_versions(self):
+        """С общим кешем версии живут дольше LOCAL_TIMEOUT"""
+        later = time.time() + versions.LOCAL_TIMEOUT + 1
+        local = versions.stamps(versions.index())
+        with mock.patch('time.time', return_value=later):
+            self.assertNotEqual(versions.stamps(versions.index()), local)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        shared_cache = {'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': directory.name,
+        }}
+        with override_settings(CACHES=shared_cache):
+            self.assertTrue(versions.shared())
+            stamps = versions.stamps(versions.index())
+            with mock.patch('time.time', return_value=later):
+                self.assertEqual(versions.stamps(versions.index()), stamps)
 
 
 class FollowViewsTest(BaseTest):
@@ -261,6 +318,143 @@ class FollowViewsTest(BaseTest):
         self.assertEqual(len(user_3_response.context['page_obj']), 0)
 
 
+class QueryCountViewsTest(BaseTest):
+
+    def count_queries(self, name):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(name)
+        return len(queries)
+
+    def test_feed_queries_do_not_grow_with_posts(self):
+        """Число запросов ленты не зависит от числа постов на странице"""
+        Follow.objects.create(user=self.user, author=self.user_2)
+        Post.objects.create(author=self.user_2, text='Текст', group=self.group)
+        names = self.url_names + [reverse('posts:follow_index')]
+        before = {name: self.count_queries(name) for name in names}
+        Post.objects.bulk_create(
+            Post(author=author, text='Текст', group=self.group)
+            for author in [self.user, self.user_2] * 4
+        )
+        for name in names:
+            with self.subTest(name=name):
+                self.assertEqual(self.count_queries(name), before[name])
+
+    def test_detail_queries_do_not_grow_with_comments(self):
+        """Число запросов поста не зависит от числа комментариев"""
+        name = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        Comment.objects.create(post=self.post, author=self.user, text='1')
+        before = self.count_queries(name)
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=author, text='Текст')
+            for author in [self.user, self.user_2] * 4
+        )
+        self.assertEqual(self.count_queries(name), before)
+
+
+class CommentPaginationViewsTest(BaseTest):
+
+    def test_comments_are_loaded_by_pages(self):
+        """Пост показывает первую страницу, фрагмент — следующую"""
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.user_2, text=f'Ответ {i}')
+            for i in range(COMMENTS_PER_PAGE + 5)
+        )
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_PER_PAGE)
+        self.assertEqual(comments[0].text, 'Ответ 0')
+        self.assertTrue(comments.has_next())
+        fragment = self.guest_client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.id}),
+            {'cursor': comments.paginator.next_cursor},
+        )
+        self.assertFalse(fragment.context['comments'].has_next())
+        texts = [comment.text for comment in fragment.context['comments']]
+        self.assertEqual(texts, [
+            f'Ответ {i}'
+            for i in range(COMMENTS_PER_PAGE, COMMENTS_PER_PAGE + 5)
+        ])
+        self.assertNotContains(fragment, 'data-fragment')
+        self.assertNotContains(fragment, '<html')
+
+
+class ConditionalViewsTest(BaseTest):
+
+    def setUp(self):
+        cache.clear()
+        self.names = [
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        ]
+
+    def revalidate(self, client, name):
+        etag = client.get(name)['ETag']
+        return client.get(name, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_pages_are_not_modified(self):
+        """Повторный запрос без изменений получает 304 без рендеринга"""
+        for name in self.names:
+            with self.subTest(name=name):
+                first = self.guest_client.get(name)
+                self.assertIn('Last-Modified', first)
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.guest_client.get(
+                        name, HTTP_IF_NONE_MATCH=first['ETag']
+                    )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(len(queries), 1)
+
+    def assertChangedBy(self, change, *names):
+        etags = {name: self.guest_client.get(name)['ETag'] for name in names}
+        change()
+        for name in names:
+            with self.subTest(name=name):
+                response = self.guest_client.get(
+                    name, HTTP_IF_NONE_MATCH=etags[name]
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_post_edit_changes_validators(self):
+        """Правка поста меняет ETag группы, профиля и самого поста"""
+        def edit():
+            self.post.text = 'Исправленный текст'
+            self.post.save()
+        self.assertChangedBy(edit, *self.names)
+
+    def test_comment_changes_post_validators(self):
+        self.assertChangedBy(
+            lambda: Comment.objects.create(
+                post=self.post, author=self.user_2, text='Комментарий'
+            ),
+            self.names[2],
+        )
+
+    def test_follow_changes_profile_validators(self):
+        self.assertChangedBy(
+            lambda: Follow.objects.create(user=self.user_2, author=self.user),
+            self.names[1],
+        )
+
+    def test_validators_depend_on_user(self):
+        """Страница другого пользователя не считается закешированной"""
+        name = self.names[1]
+        etag = self.authorized_client.get(name)['ETag']
+        response = self.authorized_client_2.get(
+            name, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_objects_still_return_404(self):
+        response = self.guest_client.get(
+            reverse('posts:profile', kwargs={'username': 'nobody'})
+        )
+        self.assertEqual(response.status_code, 404)
+
+
 class PaginatorViewsTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -294,3 +488,50 @@ class PaginatorViewsTest(TestCase):
                 self.assertEqual(len(response.context['page_obj']), 10)
                 response1 = self.guest_client.get(name + '?page=2')
                 self.assertEqual(len(response1.context['page_obj']), 3)
+
+    def test_cursor_pages_walk_whole_feed(self):
+        """Курсор проходит ленту без пропусков и возвращается назад"""
+        urls_names = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': f'{self.group.slug}'})
+        ]
+        for name in urls_names:
+            with self.subTest(name=name):
+                cache.clear()
+                first = self.guest_client.get(name).context['page_obj']
+                next_cursor = first.paginator.next_cursor
+                self.assertTrue(first.has_next())
+                second = self.guest_client.get(
+                    name, {'cursor': next_cursor}
+                ).context['page_obj']
+                self.assertEqual(len(second), 3)
+                self.assertFalse(second.has_next())
+                self.assertEqual(
+                    {post.pk for post in first} | {post.pk for post in second},
+                    {post.pk for post in Post.objects.all()},
+                )
+                back = self.guest_client.get(
+                    name, {'cursor': second.paginator.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(list(back), list(first))
+                self.assertFalse(back.has_previous())
+
+    def test_broken_cursor_shows_first_page(self):
+        """Испорченный курсор открывает первую страницу"""
+        response = self.guest_client.get(
+            reverse('posts:index'), {'cursor': 'not-a-cursor'}
+        )
+        self.assertEqual(len(response.context['page_obj']), 10)
+
+    def test_tampered_cursor_shows_first_page(self):
+        """Курсор с чужими значениями ключа открывает первую страницу"""
+        for values in (['abc', 1], ['prev', 'abc', 1], [None, None],
+                       ['2022-01-01T00:00:00', 'x'], [{}, []]):
+            with self.subTest(values=values):
+                response = self.guest_client.get(
+                    reverse('posts:index'), {'cursor': encode_cursor(values)}
+                )
+                self.assertEqual(response.status_code, 200)
+                page_obj = response.context['page_obj']
+                self.assertEqual(len(page_obj), 10)
+                self.assertFalse(page_obj.has_previous())
@@ -0,0 +1,197 @@
+"""Миниатюры картинок постов, которые готовятся в фоне.
+
+Сохранение поста с картинкой ставит её в очередь ThumbnailTask, а
+команда process_thumbnails строит миниатюры вне обработки запросов.
+Шаблоны берут миниатюру только из хранилища ключей sorl-thumbnail
+и, пока её нет, показывают оригинал; готовые миниатюры сбрасывают
+кеш лент с этими постами через invalidate().
+
+Для ленты строится набор ширин в JPEG и, если Pillow собран с WebP,
+в WebP: браузер сам выбирает вариант по srcset.
+"""
+import logging
+
+from PIL import Image, features
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import versions
+from .models import Post, ThumbnailTask
+
+logger = logging.getLogger(__name__)
+
+FEED_RATIO = (960, 339)
+FEED_WIDTHS = (320, 640, 960, 1920)
+FEED_FORMATS = (('WEBP', 'JPEG') if features.check('webp')
+                else ('JPEG',))
+FEED_OPTIONS = {'crop': 'center', 'upscale': True}
+# Ширина картинки в карточке при сетке Bootstrap 4 на всю ширину.
+FEED_SIZES = ('(min-width: 1200px) 1110px, (min-width: 992px) 930px, '
+              '(min-width: 768px) 690px, (min-width: 576px) 510px, 100vw')
+
+
+def feed_geometry(width):
+    ratio_width, ratio_height = FEED_RATIO
+    return f'{width}x{round(width * ratio_height / ratio_width)}'
+
+
+FEED_THUMBNAIL = (feed_geometry(FEED_RATIO[0]), FEED_OPTIONS)
+VARIANTS = tuple(
+    (feed_geometry(width), {**FEED_OPTIONS, 'format': format_})
+    for format_ in FEED_FORMATS
+    for width in FEED_WIDTHS
+)
+BATCH_SIZE = 20
+# Исходники лежат в хранилище поля, а миниатюры — в хранилище sorl.
+SOURCE_STORAGE = Post.image.field.storage
+
+
+class QueuedThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl, который умеет отдавать только готовые миниатюры."""
+
+    def _full_options(self, source, options):
+        options = dict(options)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        return options
+
+    def get_ready_thumbnail(self, file_, geometry_string, **options):
+        """Миниатюра из хранилища ключей или None, без обработки картинки."""
+        source = ImageFile(file_, SOURCE_STORAGE)
+        options = self._full_options(source, options)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+def ready(image, geometry_string=None, **options):
+    if geometry_string is None:
+        geometry_string, options = FEED_THUMBNAIL
+    return default.backend.get_ready_thumbnail(
+        image, geometry_string, **options
+    )
+
+
+def ready_variants(image):
+    """Готовые варианты ленты: {формат: [миниатюры по возрастанию]}."""
+    found = {}
+    for geometry_string, options in VARIANTS:
+        thumbnail = ready(image, geometry_string, **options)
+        if thumbnail is not None:
+            found.setdefault(options['format'], []).append(thumbnail)
+    return found
+
+
+def all_ready(name):
+    """Есть ли в хранилище ключей все варианты миниатюр картинки."""
+    return all(
+        ready(name, geometry_string, **options) is not None
+        for geometry_string, options in VARIANTS
+    )
+
+
+def _header_size(image_file):
+    """Размер картинки по заголовку файла, без декодирования пикселей."""
+    with image_file.storage.open(image_file.name) as file, \
+            Image.open(file) as image:
+        return image.size
+
+
+def render(name):
+    """Пишет файлы миниатюр, не трогая БД, и возвращает их размеры.
+
+    Результат — (имя, размер исходника, [(имя миниатюры, размер)]) или
+    None, если исходника нет. Годится для запуска в отдельном процессе.
+    """
+    source = ImageFile(name, SOURCE_STORAGE)
+    if not source.exists():
+        return None
+    backend = default.backend
+    source_image = None
+    thumbnails = []
+    try:
+        # Крупные варианты первыми: DraftEngine уменьшает JPEG при
+        # декодировании ровно настолько, чтобы хватило первому.
+        for geometry_string, options in reversed(VARIANTS):
+            options = backend._full_options(source, options)
+            thumbnail = ImageFile(
+                backend._get_thumbnail_filename(
+                    source, geometry_string, options
+                ),
+                default.storage,
+            )
+            if thumbnail.exists():
+                thumbnail.set_size(_header_size(thumbnail))
+            else:
+                if source_image is None:
+                    source_image = default.engine.get_image(source)
+                options['image_info'] = default.engine.get_image_info(
+                    source_image
+                )
+                backend._create_thumbnail(
+                    source_image, geometry_string, options, thumbnail
+                )
+            thumbnails.append((thumbnail.name, thumbnail.size))
+        if source_image is not None:
+            source.set_size(default.engine.get_image_size(source_image))
+        else:
+            source.set_size(_header_size(source))
+    finally:
+        if source_image is not None:
+            default.engine.cleanup(source_image)
+    return name, source.size, thumbnails
+
+
+def store(rendered):
+    """Записывает результат render() в хранилище ключей sorl."""
+    name, size, thumbnails = rendered
+    source = ImageFile(name, SOURCE_STORAGE)
+    source.set_size(size)
+    default.kvstore.get_or_set(source)
+    for thumbnail_name, thumbnail_size in thumbnails:
+        thumbnail = ImageFile(thumbnail_name, default.storage)
+        thumbnail.set_size(thumbnail_size)
+        default.kvstore.set(thumbnail, source)
+
+
+def generate(name):
+    """Строит все варианты миниатюр картинки и регистрирует их."""
+    rendered = render(name)
+    if rendered is not None:
+        store(rendered)
+
+
+def invalidate(names):
+    """Сбрасывает ленты с постами, у картинок которых готовы миниатюры."""
+    if names:
+        versions.bump_posts(Post.objects.filter(image__in=names))
+
+
+def enqueue(*names):
+    ThumbnailTask.objects.bulk_create(
+        [ThumbnailTask(name=name) for name in names], ignore_conflicts=True
+    )
+
+
+def process(batch_size=BATCH_SIZE):
+    """Обрабатывает пачку задач из очереди, возвращает их число."""
+    tasks = list(ThumbnailTask.objects.order_by('pk')[:batch_size])
+    built = []
+    for task in tasks:
+        try:
+            generate(task.name)
+        except Exception:
+            logger.exception('Не удалось построить миниатюры %s', task.name)
+        else:
+            built.append(task.name)
+    invalidate(built)
+    ThumbnailTask.objects.filter(pk__in=[task.pk for task in tasks]).delete()
+    return len(tasks)
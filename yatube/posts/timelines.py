@@ -0,0 +1,220 @@
+"""Лента подписок: гибрид рассылки при записи и сборки при чтении.
+
+Посты обычных авторов при публикации раскладываются по материализованным
+лентам подписчиков. Посты авторов, у которых подписчиков не меньше
+settings.TIMELINE_CELEBRITY_FOLLOWERS, никуда не рассылаются: при чтении
+их свежие посты достаются отдельно и сливаются с лентой по pub_date.
+Порог None означает только рассылку, 0 — только сборку при чтении.
+
+Чтобы автор у самого порога не переключался туда и обратно, посты
+собираются при чтении, пока подписчиков не станет меньше доли
+DEMOTION_SHARE от порога; между двумя порогами посты и рассылаются,
+и собираются, а повторы убирает слияние. Посты, написанные автором
+выше порога, не разосланы, поэтому, опустившись ниже нижнего порога,
+он попадает в очередь TimelineTask: её разбирает команда
+process_timelines вне обработки запросов, а до тех пор посты автора
+по-прежнему собираются при чтении.
+"""
+from itertools import islice
+from operator import attrgetter
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Follow, Post, TimelineEntry, TimelineTask, UserCounters
+from .paginators import FEED_ORDERING
+
+BATCH_SIZE = 1000
+TASK_BATCH_SIZE = 10
+TIMELINE_ORDERING = ('-pub_date', '-post_id')
+DEMOTION_SHARE = 0.9
+
+
+def celebrity_threshold():
+    return settings.TIMELINE_CELEBRITY_FOLLOWERS
+
+
+def demotion_threshold(threshold):
+    """Число подписчиков, ниже которого посты перестают собираться."""
+    return int(threshold * DEMOTION_SHARE)
+
+
+def follower_counts(author_ids):
+    """Число подписчиков для каждого из авторов по счётчикам."""
+    counts = UserCounters.objects.filter(user_id__in=author_ids).values_list(
+        'user_id', 'followers_count'
+    )
+    return dict(counts)
+
+
+def is_celebrity(author_id):
+    threshold = celebrity_threshold()
+    if threshold is None:
+        return False
+    return follower_counts([author_id]).get(author_id, 0) >= threshold
+
+
+def celebrities_followed_by(user):
+    """Авторы из подписок пользователя, чьи посты собираются при чтении."""
+    threshold = celebrity_threshold()
+    if threshold is None:
+        return []
+    follows = Follow.objects.filter(user=user)
+    if threshold > 0:
+        follows = follows.filter(
+            Q(author__counters__followers_count__gte=demotion_threshold(
+                threshold
+            ))
+            | Q(author__timeline_task__isnull=False)
+        )
+    return list(follows.values_list('author_id', flat=True))
+
+
+def _insert(entries, batch_size=BATCH_SIZE):
+    """Вставляет записи пачками, не собирая их все в памяти."""
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, batch_size))
+        if not batch:
+            return
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def push_post(post):
+    """Добавляет новый пост в ленты подписчиков обычного автора."""
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(author_id=post.author_id).values_list(
+        'user_id', flat=True
+    )
+    _insert(
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def push_posts(posts):
+    """Раскладывает по лентам пачку новых постов разом, см. push_post."""
+    threshold = celebrity_threshold()
+    author_ids = {post.author_id for post in posts}
+    if threshold is not None:
+        counts = follower_counts(author_ids)
+        author_ids = {author_id for author_id in author_ids
+                      if counts.get(author_id, 0) < threshold}
+    followers = {}
+    follows = Follow.objects.filter(author_id__in=author_ids).values_list(
+        'author_id', 'user_id'
+    )
+    for author_id, user_id in follows.iterator():
+        followers.setdefault(author_id, []).append(user_id)
+    _insert(
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for post in posts
+        for user_id in followers.get(post.author_id, ())
+    )
+
+
+def backfill(user_id, author_id, batch_size=BATCH_SIZE):
+    """Переносит посты обычного автора в ленту нового подписчика."""
+    if not is_celebrity(author_id):
+        _backfill(user_id, author_id, batch_size)
+
+
+def _backfill(user_id, author_id, batch_size):
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'id', 'pub_date'
+    )
+    _insert(
+        (TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts.iterator(chunk_size=batch_size)),
+        batch_size,
+    )
+
+
+def check_demotion(author_id):
+    """Ставит автора в очередь, если он только что опустился ниже
+    нижнего порога; вызывается после отписки, когда счётчик уменьшен."""
+    threshold = celebrity_threshold()
+    if not threshold:
+        return
+    count = follower_counts([author_id]).get(author_id, 0)
+    if count == demotion_threshold(threshold) - 1:
+        TimelineTask.objects.bulk_create(
+            [TimelineTask(author_id=author_id)], ignore_conflicts=True
+        )
+
+
+def fan_out(author_id, batch_size=BATCH_SIZE):
+    """Раскладывает все посты автора по лентам его подписчиков."""
+    posts = list(Post.objects.filter(author_id=author_id).values_list(
+        'id', 'pub_date'
+    ))
+    followers = Follow.objects.filter(author_id=author_id).values_list(
+        'user_id', flat=True
+    )
+    _insert(
+        (TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for user_id in followers.iterator(chunk_size=batch_size)
+         for post_id, pub_date in posts),
+        batch_size,
+    )
+
+
+def process(batch_size=TASK_BATCH_SIZE):
+    """Разбирает пачку очереди TimelineTask, возвращает число задач.
+
+    Задача удаляется только после рассылки, чтобы посты автора до тех
+    пор собирались при чтении. Если автор успел снова подняться выше
+    нижнего порога, рассылка не нужна.
+    """
+    tasks = list(TimelineTask.objects.order_by('pk')[:batch_size])
+    threshold = celebrity_threshold()
+    counts = follower_counts([task.author_id for task in tasks])
+    for task in tasks:
+        if not threshold or (
+            counts.get(task.author_id, 0) < demotion_threshold(threshold)
+        ):
+            fan_out(task.author_id)
+        task.delete()
+    return len(tasks)
+
+
+def prune(user_id, author_id):
+    """Убирает посты автора из ленты бывшего подписчика."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild(batch_size=BATCH_SIZE):
+    """Пересобирает все ленты с нуля и возвращает число записей."""
+    TimelineEntry.objects.all().delete()
+    TimelineTask.objects.all().delete()
+    threshold = celebrity_threshold()
+    celebrities = set()
+    if threshold is not None:
+        counts = UserCounters.objects.filter(
+            followers_count__gte=threshold
+        ).values_list('user_id', flat=True)
+        celebrities.update(counts.iterator())
+    follows = Follow.objects.values_list('user_id', 'author_id')
+    for user_id, author_id in follows.iterator(chunk_size=batch_size):
+        if author_id not in celebrities:
+            _backfill(user_id, author_id, batch_size)
+    return TimelineEntry.objects.count()
+
+
+def timeline(user):
+    """Записи ленты подписок пользователя вместе с постами."""
+    return TimelineEntry.objects.filter(user=user).select_related(
+        'post__author', 'post__group'
+    )
+
+
+def sources(user):
+    """Источники ленты для MergedCursorPaginator: лента и посты «звёзд»."""
+    feed_sources = [(timeline(user), TIMELINE_ORDERING, attrgetter('post'))]
+    for author_id in celebrities_followed_by(user):
+        posts = Post.objects.feed().filter(author_id=author_id)
+        feed_sources.append((posts, FEED_ORDERING, None))
+    return feed_sources
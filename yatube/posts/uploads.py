@@ -0,0 +1,107 @@
+"""Приём картинок постов с ограниченным расходом памяти.
+
+Обработчик загрузки перестаёт принимать файл, как только тот превысил
+лимит по байтам, и отдаёт вместо него пустую заглушку. Форма проверяет
+формат и размер в пикселях по заголовку, до декодирования, а большие
+или содержащие EXIF картинки перекодирует с ограничением по стороне.
+"""
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import (
+    TemporaryUploadedFile, UploadedFile
+)
+from django.core.files.uploadhandler import FileUploadHandler
+from PIL import Image, ImageOps
+
+MAX_BYTES = 10 * 1024 * 1024
+MAX_PIXELS = 25000000
+MAX_SIDE = 2560
+FORMATS = {'JPEG', 'PNG', 'GIF', 'WEBP'}
+# Форматы, которые пересохраняются без EXIF и с ограничением по стороне.
+REENCODE_FORMATS = {'JPEG', 'PNG', 'WEBP'}
+JPEG_QUALITY = 90
+
+
+class RejectedUpload(UploadedFile):
+    """Заглушка вместо файла, который превысил лимит по байтам."""
+
+    def __init__(self, name, content_type, size):
+        super().__init__(None, name, content_type, size)
+
+
+class SizeLimitUploadHandler(FileUploadHandler):
+    """Не пропускает дальше байты файла сверх MAX_BYTES."""
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > MAX_BYTES:
+            return None
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.received > MAX_BYTES:
+            return RejectedUpload(
+                self.file_name, self.content_type, self.received
+            )
+        return None
+
+
+def rejection_error():
+    return ValidationError(
+        'Файл больше %(limit)d МБ.',
+        code='file_too_large',
+        params={'limit': MAX_BYTES // (1024 * 1024)},
+    )
+
+
+def _reencode(image, upload):
+    if image.format == 'JPEG':
+        # Декодирует JPEG сразу в уменьшенном масштабе.
+        image.draft('RGB', (MAX_SIDE, MAX_SIDE))
+    format_ = image.format
+    image = ImageOps.exif_transpose(image)
+    image.info.pop('exif', None)
+    image.thumbnail((MAX_SIDE, MAX_SIDE))
+    options = {}
+    if format_ == 'JPEG':
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        options = {'quality': JPEG_QUALITY, 'optimize': True}
+    result = TemporaryUploadedFile(
+        upload.name, upload.content_type, 0, None
+    )
+    image.save(result, format_, **options)
+    result.size = result.tell()
+    result.seek(0)
+    return result
+
+
+def sanitize(upload):
+    """Проверяет картинку по заголовку и при нужде перекодирует её.
+
+    Возвращает исходный файл или новый, без EXIF и не больше MAX_SIDE
+    по большей стороне.
+    """
+    upload.seek(0)
+    with Image.open(upload) as image:
+        if image.format not in FORMATS:
+            raise ValidationError(
+                'Поддерживаются картинки JPEG, PNG, GIF и WebP.',
+                code='invalid_format',
+            )
+        width, height = image.size
+        if width * height > MAX_PIXELS:
+            raise ValidationError(
+                'Картинка больше %(limit)d мегапикселей.',
+                code='too_many_pixels',
+                params={'limit': MAX_PIXELS // 1000000},
+            )
+        if image.format in REENCODE_FORMATS and (
+            max(width, height) > MAX_SIDE or 'exif' in image.info
+        ):
+            return _reencode(image, upload)
+    upload.seek(0)
+    return upload
@@ -0,0 +1,116 @@
+"""Версии кешированных фрагментов лент.
+
+Ключ фрагмента включает версии всего, что в нём показано: ленты
+(главная, группа, профиль) и отображаемых данных авторов и групп. Сигналы
+увеличивают версию при изменении постов, групп и пользователей, так
+что фрагмент живёт долго, но устаревает сразу после изменения.
+Версия — время последнего изменения в наносекундах: после вытеснения
+ключа из кеша номер не возвращается к старому, а по версиям можно
+выставить Last-Modified.
+
+Версии должны быть видны всем процессам сервера, поэтому в бою нужен
+общий кеш (Redis, memcached). У LocMemCache кеш свой у каждого процесса,
+и смена версии в одном не доходит до других; с ним версии и фрагменты
+живут не дольше LOCAL_TIMEOUT, так что чужие процессы отстают не больше
+чем на этот срок — и фрагменты, и ETag условных GET.
+"""
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+PREFIX = 'feed_version'
+AUTHORS = 'authors'
+GROUPS = 'groups'
+LOCAL_TIMEOUT = 20
+
+
+def shared():
+    """Общий ли кеш у всех процессов сервера."""
+    return not isinstance(caches['default'], LocMemCache)
+
+
+def timeout():
+    """Срок жизни фрагментов лент для тега {% cache %}."""
+    if shared():
+        return settings.FEED_CACHE_TIMEOUT
+    return min(settings.FEED_CACHE_TIMEOUT, LOCAL_TIMEOUT)
+
+
+def _version_timeout():
+    return None if shared() else LOCAL_TIMEOUT
+
+
+def index():
+    return 'index'
+
+
+def group(group_id):
+    return f'group:{group_id}'
+
+
+def profile(author_id):
+    return f'profile:{author_id}'
+
+
+def follows(user_id):
+    return f'follows:{user_id}'
+
+
+def _key(name):
+    return f'{PREFIX}:{name}'
+
+
+def stamps(*names):
+    """Версии лент вместе с версиями авторов и групп."""
+    keys = [_key(name) for name in (AUTHORS, GROUPS) + names]
+    found = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=_version_timeout())
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def join(values):
+    return '.'.join(str(value) for value in values)
+
+
+def changed(values):
+    """Время последнего изменения по версиям из stamps()."""
+    return datetime.fromtimestamp(max(values) / 1e9, tz=timezone.utc)
+
+
+def get(*names):
+    """Общая версия лент вместе с данными авторов и групп одной строкой."""
+    return join(stamps(*names))
+
+
+def bump(*names):
+    now = time.time_ns()
+    cache.set_many(
+        {_key(name): now for name in names}, timeout=_version_timeout()
+    )
+
+
+def bump_posts(posts):
+    """Сбрасывает главную и ленты авторов и групп постов из posts.
+
+    Для изменений в обход сигналов Post: update, bulk_update,
+    построенные в фоне миниатюры.
+    """
+    affected = posts.order_by().values_list('author_id', 'group_id')
+    authors, groups = set(), set()
+    for author_id, group_id in affected.distinct():
+        authors.add(author_id)
+        if group_id:
+            groups.add(group_id)
+    if not authors:
+        return
+    bump(
+        index(),
+        *(profile(author_id) for author_id in authors),
+        *(group(group_id) for group_id in groups),
+    )
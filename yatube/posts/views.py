@@ -1,44 +1,106 @@
+from urllib.parse import urlencode
+
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.http import (
+    FileResponse, HttpResponseBadRequest, StreamingHttpResponse
+)
+from django.db.models import OuterRef, Subquery
 from django.shortcuts import render, get_object_or_404, redirect
 
-from .models import Post, Group, User, Follow
+from .models import Comment, ExportArchive, Post, Group, User, Follow
+from . import archives, counters, exports, search, timelines, versions
+from .conditional import conditional
 from .forms import PostForm, CommentForm
+from .paginators import (
+    COMMENT_ORDERING, COMMENTS_PER_PAGE, POSTS_PER_PAGE, CursorPaginator,
+    page_mode, paginate, paginate_merged
+)
 
 
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    post_list = Post.objects.feed()
+    page_obj = paginate(request, post_list)
     template = 'posts/index.html'
     context = {
         'page_obj': page_obj,
+        'cache_version': versions.get(versions.index()),
+        'cache_timeout': versions.timeout(),
     }
     return render(request, template, context)
 
 
+def _latest(queryset, field):
+    """Подзапрос с самой свежей датой field — один шаг по индексу."""
+    return Subquery(
+        queryset.order_by(f'-{field}').values(field)[:1]
+    )
+
+
+def _first(queryset, *fields):
+    return next(iter(queryset.order_by().values_list(*fields)), None)
+
+
+def _group_validators(request, slug):
+    found = _first(Group.objects.filter(slug=slug).annotate(
+        newest=_latest(Post.objects.filter(group=OuterRef('pk')), 'pub_date')
+    ), 'pk', 'newest')
+    if found is None:
+        return None
+    group_id, newest = found
+    return (versions.group(group_id),), newest
+
+
+def _profile_validators(request, username):
+    found = _first(User.objects.filter(username=username).annotate(
+        newest=_latest(Post.objects.filter(author=OuterRef('pk')), 'pub_date')
+    ), 'pk', 'newest')
+    if found is None:
+        return None
+    author_id, newest = found
+    names = [versions.profile(author_id), versions.follows(author_id)]
+    if request.user.is_authenticated:
+        names.append(versions.follows(request.user.pk))
+    return names, newest
+
+
+def _post_validators(request, post_id):
+    # Правки поста и число постов автора покрывает версия профиля,
+    # новые и удалённые комментарии — дата последнего и их число.
+    found = _first(Post.objects.filter(pk=post_id).annotate(
+        last_comment=_latest(
+            Comment.objects.filter(post=OuterRef('pk')), 'created'
+        )
+    ), 'author_id', 'pub_date', 'last_comment', 'comments_count')
+    if found is None:
+        return None
+    author_id, *parts = found
+    return ((versions.profile(author_id),), *parts)
+
+
+@conditional(_group_validators)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = group.posts.feed()
+    page_obj = paginate(request, posts)
     template = 'posts/group_list.html'
     context = {
         'group': group,
         'page_obj': page_obj,
+        'cache_version': versions.get(versions.group(group.pk)),
+        'cache_timeout': versions.timeout(),
     }
     return render(request, template, context)
 
 
+@conditional(_profile_validators)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    post_count = author.posts.count()
+    author = get_object_or_404(
+        User.objects.select_related('counters'), username=username
+    )
+    posts = author.posts.feed()
+    page_obj = paginate(request, posts)
+    author_counters = counters.of(author)
     template = 'posts/profile.html'
     following = (request.user.is_authenticated and (request.user != author)
                  and Follow.objects.filter(
@@ -48,25 +110,65 @@ def profile(request, username):
     context = {
         'author': author,
         'page_obj': page_obj,
-        'post_count': post_count,
+        'post_count': author_counters.posts_count,
+        'author_counters': author_counters,
         'following': following,
+        'cache_version': versions.get(versions.profile(author.pk)),
+        'cache_timeout': versions.timeout(),
+    }
+    return render(request, template, context)
+
+
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        results = search.matching(query).order_by(*search.SEARCH_ORDERING)
+        paginator = CursorPaginator(
+            results, POSTS_PER_PAGE, search.SEARCH_ORDERING
+        )
+        page_obj = paginator.get_page(request.GET.get('cursor'))
+        page_obj.object_list = [row.post for row in page_obj]
+    template = 'posts/search.html'
+    context = {
+        'query': query,
+        'query_string': urlencode({'q': query}),
+        'page_obj': page_obj,
     }
     return render(request, template, context)
 
 
+@conditional(_post_validators)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.feed().select_related('author__counters'), id=post_id
+    )
     form_comment = CommentForm()
-    comments = post.comments.all()
     template = 'posts/post_detail.html'
     context = {
         'post': post,
+        'post_count': counters.of(post.author).posts_count,
         'form_comment': form_comment,
-        'comments': comments,
+        'comments': _comment_page(request, post),
     }
     return render(request, template, context)
 
 
+def _comment_page(request, post):
+    """Страница комментариев в порядке написания, курсор по (created, id)."""
+    comments = post.comments.with_authors().order_by(*COMMENT_ORDERING)
+    paginator = CursorPaginator(comments, COMMENTS_PER_PAGE, COMMENT_ORDERING)
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+@conditional(_post_validators)
+def post_comments(request, post_id):
+    """Фрагмент со следующей страницей комментариев для подгрузки."""
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    context = {'post': post, 'comments': _comment_page(request, post)}
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
 @login_required
 def post_create(request):
     if request.method != 'POST':
@@ -122,10 +224,13 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    if page_mode(request):
+        posts = Post.objects.feed().filter(
+            author__following__user=request.user
+        )
+        page_obj = paginate(request, posts)
+    else:
+        page_obj = paginate_merged(request, timelines.sources(request.user))
     context = {'page_obj': page_obj}
     return render(request, 'posts/follow.html', context)
 
@@ -151,3 +256,54 @@ def profile_unfollow(request, username):
     )
     is_followed.delete()
     return redirect('posts:index')
+
+
+@staff_member_required
+def export(request, kind):
+    """Потоковая выгрузка kind в NDJSON или CSV с фильтрами из GET."""
+    format_ = request.GET.get('format', 'ndjson')
+    try:
+        header, values = exports.rows(
+            kind,
+            author=request.GET.get('author'),
+            group=request.GET.get('group'),
+            since=request.GET.get('since'),
+            until=request.GET.get('until'),
+            user=request.GET.get('user'),
+        )
+        lines = exports.lines(format_, header, values)
+    except exports.ExportError as error:
+        return HttpResponseBadRequest(str(error))
+    response = StreamingHttpResponse(
+        lines, content_type=exports.FORMATS[format_]
+    )
+    extension = 'csv' if format_ == 'csv' else 'ndjson'
+    response['Content-Disposition'] = (
+        f'attachment; filename="{kind}.{extension}"'
+    )
+    return response
+
+
+@login_required
+def archive(request):
+    """Заказ архива со своими данными и ссылка на готовый."""
+    if request.method == 'POST':
+        archives.request_archive(request.user)
+        return redirect('posts:archive')
+    context = {
+        'archives': request.user.export_archives.all()[:5],
+    }
+    return render(request, 'posts/archive.html', context)
+
+
+@login_required
+def archive_download(request, archive_id):
+    archive = get_object_or_404(
+        ExportArchive, pk=archive_id, user=request.user,
+        status=ExportArchive.READY,
+    )
+    filename = (f'yatube-{request.user.username}-'
+                f'{archive.finished:%Y%m%d}.zip')
+    return FileResponse(
+        open(archive.path, 'rb'), as_attachment=True, filename=filename
+    )
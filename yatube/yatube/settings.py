@@ -34,7 +34,10 @@ INSTALLED_APPS = [
     'debug_toolbar',
 ]
 
+# ServerTimingMiddleware стоит первым, чтобы общее время покрывало
+# остальные middleware.
 MIDDLEWARE = [
+    'core.timing.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -55,7 +58,8 @@ TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Бэкенд Django, который сообщает время рендеринга в Server-Timing.
+        'BACKEND': 'core.timing.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -132,6 +136,64 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        # LocMemCache со счётчиками попаданий для Server-Timing; для
+        # другого бэкенда подмешайте к нему core.timing.TimedCacheMixin.
+        # При нескольких процессах нужен общий кеш (Redis, memcached):
+        # с LocMemCache версии лент из posts.versions живут лишь
+        # posts.versions.LOCAL_TIMEOUT секунд, см. там.
+        'BACKEND': 'core.timing.TimedLocMemCache',
     }
 }
+
+# Заголовок Server-Timing и строка лога от core.timing: None — только
+# при DEBUG (заголовок ещё и сотрудникам), True/False — всегда/никогда.
+SERVER_TIMING_HEADER = None
+SERVER_TIMING_LOG = None
+
+# Строка logfmt на запрос от core.timing.ServerTimingMiddleware, если она
+# включена, уходит в stderr; остальные логгеры Django работают как обычно.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.timing': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# Режим пагинации лент: 'cursor' (keyset по pub_date, id) или 'page'.
+POSTS_PAGINATION = 'cursor'
+
+# Число подписчиков, начиная с которого посты автора не рассылаются по
+# лентам, а собираются при чтении. None — только рассылка, 0 — только сборка.
+TIMELINE_CELEBRITY_FOLLOWERS = 10000
+
+# Время жизни фрагментов лент: они сбрасываются сменой версии в
+# posts.versions, так что срок нужен лишь для вытеснения мусора.
+# Действует только с общим кешем, с LocMemCache срок короткий.
+FEED_CACHE_TIMEOUT = 60 * 60 * 12
+
+# Шаблоны получают только готовые миниатюры, строит их process_thumbnails.
+THUMBNAIL_BACKEND = 'posts.thumbnails.QueuedThumbnailBackend'
+
+# Загрузки сверх posts.uploads.MAX_BYTES отбрасываются по мере приёма,
+# остальное как обычно: мелкие файлы в памяти, крупные во временных.
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.SizeLimitUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Уменьшает JPEG уже при декодировании, см. posts.engines.
+THUMBNAIL_ENGINE = 'posts.engines.DraftEngine'
+
+# Архивы с данными пользователей: вне MEDIA_ROOT, их отдаёт только view.
+EXPORT_ARCHIVES_ROOT = os.path.join(BASE_DIR, 'archives')
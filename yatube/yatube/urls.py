@@ -1,5 +1,8 @@
+from django.conf import settings
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
+
+from core.views import media
 
 
 urlpatterns = [
@@ -10,6 +13,11 @@ urlpatterns = [
     path('about/', include('about.urls', namespace='about'))
 ]
 
+if settings.DEBUG:
+    urlpatterns += [
+        re_path(r'^media/(?P<path>.*)$', media),
+    ]
+
 handler404 = 'core.views.page_not_found'
 handler500 = 'core.views.server_error'
 handler403 = 'core.views.csrf_failure'